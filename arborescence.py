@@ -0,0 +1,432 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code enumerates the spanning arborescences rooted at vertex 0 of a
+# matrix digraph in its array form.  An arborescence is returned as a parent
+# array p of length N, with p[v - 1] the tail of the arc into vertex v, along
+# with the log of the absolute value of its weight and the sign of its
+# weight.
+
+import os
+import heapq
+import numpy as np
+
+# Arc list of the matrix digraph, with the root arcs included.
+
+
+class _Arcs:
+    def __init__(self, D):
+
+        roots = D.root_vertices()
+
+        self.n = D.n
+        self.tail = np.concatenate((np.zeros(len(roots), int), D.tail))
+        self.head = np.concatenate((roots, D.head))
+        self.weight = np.concatenate((D.root[roots], D.weight))
+        self.lweight = np.concatenate((D.root_lweight[roots], D.lweight))
+        self.sign = np.concatenate((D.root_sign[roots], D.sign))
+
+        self.out = [[] for u in range(self.n + 1)]
+        self.inn = [[] for v in range(self.n + 1)]
+        for k, (u, v) in enumerate(zip(self.tail, self.head)):
+            self.out[u].append(k)
+            self.inn[v].append(k)
+
+    def spans(self):
+        seen = {0}
+        stack = [0]
+        while stack:
+            u = stack.pop()
+            for k in self.out[u]:
+                if self.head[k] not in seen:
+                    seen.add(self.head[k])
+                    stack.append(self.head[k])
+        return len(seen) == self.n + 1
+
+
+# Routine to enumerate all the arborescences, in no particular order, by the
+# Gabow-Myers backtracking.  The tree grows from the root by taking the last
+# arc on the stack of arcs leaving the tree.  On backtracking, that arc is
+# deleted and the next one is tried, until the deleted arc is a bridge (its
+# head cannot be reached otherwise), which is tested against the last tree
+# found.
+#
+# The position of the enumeration is its path, the number of the arc being
+# tried at each depth, which is kept in state["path"] and is that of the last
+# arborescence yielded.  Given the state of an earlier enumeration of the same
+# digraph, the enumeration resumes after that arborescence: the arcs tried
+# before the path are deleted again without their subtrees being grown.
+
+
+def iter_arborescences(D, state=None):
+
+    arcs = _Arcs(D)
+
+    if arcs.n < 1 or not arcs.spans():
+        return
+
+    n = arcs.n
+    tail, head = arcs.tail, arcs.head
+    lweight, sign = arcs.lweight, arcs.sign
+    in_tree = np.zeros(n + 1, bool)
+    in_tree[0] = True
+    deleted = np.zeros(len(head), bool)
+    parent = np.zeros(n + 1, int)
+    last = np.zeros(n + 1, int)
+
+    if state is None:
+        state = {}
+    replay = state.get("path")
+    path = [0] * n
+    state["path"] = path
+
+    def is_descendant(w, v):
+        while w != 0:
+            if w == v:
+                return True
+            w = tail[last[w]]
+        return False
+
+    def grow(stack, size, lw, sg):
+
+        nonlocal replay
+
+        if size == n:
+            last[:] = parent
+            if replay is not None:
+                replay = None
+                return
+            yield tail[parent[1:]].astype(np.int32), lw, sg
+            return
+
+        stack = list(stack)
+        excluded = []
+        skip = replay[size] if replay is not None else 0
+        i = 0
+
+        while True:
+            e = stack.pop()
+            v = head[e]
+
+            if i < skip:
+                deleted[e] = True
+                excluded.append(e)
+                i += 1
+                continue
+
+            path[size] = i
+            in_tree[v] = True
+            parent[v] = e
+            child = [k for k in stack if head[k] != v]
+            child += [
+                k
+                for k in arcs.out[v]
+                if not in_tree[head[k]] and not deleted[k]
+            ]
+            yield from grow(child, size + 1, lw + lweight[e], sg * sign[e])
+            in_tree[v] = False
+
+            deleted[e] = True
+            excluded.append(e)
+
+            if not any(
+                not deleted[k] and not is_descendant(tail[k], v)
+                for k in arcs.inn[v]
+            ):
+                break
+
+            i += 1
+
+        for e in excluded:
+            deleted[e] = False
+
+    yield from grow(arcs.out[0], 0, 0.0, 1.0)
+
+
+# Routine to find the maximum-score arborescence for a score matrix s, with
+# s[u, v] the score of arc u -> v and -inf for a missing arc, by the
+# Chu-Liu/Edmonds contraction.  Returns the parent array over all the vertices
+# (with -1 for the root) or None if there is no arborescence.
+
+
+def _max_arborescence(s):
+
+    n = s.shape[0]
+
+    parent = np.argmax(s, axis=0)
+    parent[0] = -1
+
+    if np.any(s[parent[1:], np.arange(1, n)] == -np.inf):
+        return None
+
+    # Find a cycle
+
+    cycle = None
+    color = np.zeros(n, int)
+    for v0 in range(1, n):
+        v = v0
+        while v > 0 and color[v] == 0:
+            color[v] = v0
+            v = parent[v]
+        if v > 0 and color[v] == v0:
+            cycle = [v]
+            u = parent[v]
+            while u != v:
+                cycle.append(u)
+                u = parent[u]
+            break
+
+    if cycle is None:
+        return parent
+
+    # Contract the cycle into a single vertex c
+
+    in_cycle = np.zeros(n, bool)
+    in_cycle[cycle] = True
+    rest = np.flatnonzero(~in_cycle)
+    c = len(rest)
+
+    cyc = np.array(cycle)
+    t = s[:, cyc] - s[parent[cyc], cyc]
+    enter = cyc[np.argmax(t, axis=1)]
+    leave = cyc[np.argmax(s[cyc, :], axis=0)]
+
+    s_c = np.full((c + 1, c + 1), -np.inf)
+    s_c[:c, :c] = s[np.ix_(rest, rest)]
+    s_c[:c, c] = np.max(t[rest], axis=1)
+    s_c[c, :c] = np.max(s[np.ix_(cyc, rest)], axis=0)
+
+    p_c = _max_arborescence(s_c)
+
+    if p_c is None:
+        return None
+
+    # Expand the cycle
+
+    for i, v in enumerate(rest[1:], start=1):
+        if p_c[i] == c:
+            parent[v] = leave[v]
+        else:
+            parent[v] = rest[p_c[i]]
+
+    u = rest[p_c[c]]
+    parent[enter[u]] = u
+
+    return parent
+
+
+# Routine to enumerate the arborescences in decreasing order of the sum of
+# the arc log weights (that is, of the absolute value of the weight) by
+# Lawler's partitioning of the solution space.  Each subspace fixes some arcs
+# as included and some as excluded, and its best arborescence is found with
+# the Edmonds algorithm on the constrained score matrix.  The subspaces of an
+# arborescence are added to the heap before it is yielded, so the heap, kept
+# with its counter in state, always holds the arborescences still to come.
+# Given the state of an earlier enumeration of the same digraph, the
+# enumeration resumes from it.
+
+
+def iter_best_arborescences(D, state=None):
+
+    arcs = _Arcs(D)
+    n = arcs.n
+
+    if n < 1:
+        return
+
+    score = np.full((n + 1, n + 1), -np.inf)
+    sign = np.zeros((n + 1, n + 1))
+    score[arcs.tail, arcs.head] = arcs.lweight
+    sign[arcs.tail, arcs.head] = arcs.sign
+
+    vertices = np.arange(1, n + 1)
+
+    def solve(include, exclude):
+        s = score.copy()
+        for u, v in include:
+            keep = s[u, v]
+            s[:, v] = -np.inf
+            s[u, v] = keep
+        for u, v in exclude:
+            s[u, v] = -np.inf
+        p = _max_arborescence(s)
+        if p is None:
+            return None
+        return (-np.sum(score[p[1:], vertices]), p)
+
+    if state is None:
+        state = {}
+
+    if "heap" in state:
+        heap = state["heap"]
+        counter = state["counter"]
+    else:
+        heap = []
+        counter = 0
+        best = solve((), ())
+        if best is not None:
+            heap.append((best[0], counter, (), (), best[1]))
+        state["heap"] = heap
+
+    while heap:
+        neg, _, include, exclude, p = heapq.heappop(heap)
+
+        fixed = {v for u, v in include}
+        free = [(p[v], v) for v in vertices if v not in fixed]
+        for i, e in enumerate(free):
+            new_include = include + tuple(free[:i])
+            new_exclude = exclude + (e,)
+            best = solve(new_include, new_exclude)
+            if best is not None:
+                counter += 1
+                heapq.heappush(
+                    heap, (best[0], counter, new_include, new_exclude, best[1])
+                )
+
+        state["counter"] = counter
+
+        yield p[1:].astype(np.int32), -neg, np.prod(sign[p[1:], vertices])
+
+
+# Compact container for arborescences.  The arborescences are held as an
+# int32 array of parent arrays, of shape (count, N), with float64 log weights
+# and int8 signs.  They are appended into fixed-size chunks, which are joined
+# on first access.  The container is saved as a .npz file or as a .npy file
+# of a structured array, which may be memory-mapped on loading.  Graphs are
+# only built on request from the matrix digraph.
+
+
+class ArborescenceArray:
+    def __init__(self, n, chunk=65536):
+        self.n = n
+        self.chunk = chunk
+        self._chunks = []
+        self._fill = 0
+        self._new_chunk()
+        self._data = np.zeros(0, self._dtype())
+
+    def _dtype(self):
+        return np.dtype(
+            [
+                ("parent", np.int32, (self.n,)),
+                ("lweight", "f8"),
+                ("sign", "i1"),
+            ]
+        )
+
+    def _new_chunk(self):
+        self._buffer = np.zeros(self.chunk, self._dtype())
+        self._fill = 0
+
+    def append(self, parent, lweight, sign):
+        self._buffer[self._fill] = (parent, lweight, sign)
+        self._fill += 1
+        if self._fill == self.chunk:
+            self._chunks.append(self._buffer)
+            self._new_chunk()
+
+    def extend(self, arborescences):
+        for parent, lweight, sign in arborescences:
+            self.append(parent, lweight, sign)
+
+    @property
+    def data(self):
+        if self._chunks or self._fill:
+            self._data = np.concatenate(
+                [self._data] + self._chunks + [self._buffer[: self._fill]]
+            )
+            self._chunks = []
+            self._new_chunk()
+        return self._data
+
+    def __len__(self):
+        return len(self._data) + self.chunk * len(self._chunks) + self._fill
+
+    def __iter__(self):
+        for a in self.data:
+            yield a["parent"], a["lweight"], a["sign"]
+
+    @property
+    def parents(self):
+        return self.data["parent"]
+
+    @property
+    def lweights(self):
+        return self.data["lweight"]
+
+    @property
+    def signs(self):
+        return self.data["sign"]
+
+    def weights(self):
+        return self.signs * np.exp(self.lweights)
+
+    # Routine to sort the arborescences in decreasing order of the absolute
+    # value of their weight
+
+    def sort(self):
+        order = np.argsort(-self.lweights, kind="stable")
+        self._data = self.data[order]
+
+    def save(self, file):
+        if os.path.splitext(file)[1] == ".npy":
+            np.save(file, self.data)
+        else:
+            np.savez(
+                file,
+                parent=self.parents,
+                lweight=self.lweights,
+                sign=self.signs,
+            )
+
+    @classmethod
+    def load(cls, file, mmap=True):
+        if os.path.splitext(file)[1] == ".npy":
+            data = np.load(file, mmap_mode="r" if mmap else None)
+            result = cls(data.dtype["parent"].shape[0])
+            result._data = data
+            return result
+        with np.load(file) as z:
+            result = cls(z["parent"].shape[1])
+            data = np.zeros(len(z["lweight"]), result._dtype())
+            data["parent"] = z["parent"]
+            data["lweight"] = z["lweight"]
+            data["sign"] = z["sign"]
+            result._data = data
+        return result
+
+    # Routine to return arborescence i as a networkx graph with the arc
+    # attributes of the matrix digraph D
+
+    def to_graph(self, i, D, labels=True):
+
+        import networkx as nx
+
+        G = nx.DiGraph()
+
+        for v, u in enumerate(self.parents[i], start=1):
+            u = int(u)
+            G.add_edge(u, v, weight=D.arc_weight(u, v))
+            if labels:
+                G[u][v]["label"] = D.label(u, v)
+
+        return G
@@ -0,0 +1,375 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code computes the determinants of a collection of matrices on a pool of
+# worker processes.  The matrices are given by matrix files, directories of
+# matrix files, glob patterns, and manifests (text files with one matrix file
+# per line), and each matrix of a .npz ensemble is a separate job.  Each job
+# runs under a time limit, which the main process enforces by stopping a
+# worker that runs past it (a signal in the worker could not interrupt a long
+# call into compiled code) and starting a new one in its place.  The results
+# are written, in the order of the jobs, as JSON lines or as CSV.
+
+import os
+import sys
+import csv
+import glob
+import time
+import argparse
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from itertools import islice
+from collections import deque
+import numpy as np
+import matrix_graph as mg
+import determinant as dt
+
+FIELDS = [
+    "source",
+    "index",
+    "method",
+    "sign",
+    "log",
+    "determinant",
+    "terms",
+    "time",
+    "error",
+]
+
+# Routine to return the matrix files of the inputs, in order.  A directory
+# gives its files in sorted order, and an input that is not a file or a
+# directory is a glob pattern.  The files listed in a manifest are relative
+# to the directory of the manifest.
+
+
+def matrix_files(inputs, manifest=None):
+
+    files = []
+
+    for name in inputs:
+        if os.path.isdir(name):
+            files += sorted(
+                f
+                for f in glob.glob(os.path.join(name, "*"))
+                if os.path.isfile(f)
+            )
+        elif os.path.isfile(name):
+            files.append(name)
+        else:
+            files += sorted(glob.glob(name))
+
+    if manifest:
+        base = os.path.dirname(manifest)
+        with open(manifest) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    files.append(os.path.join(base, line))
+
+    return files
+
+
+def _is_ensemble(file):
+    if os.path.splitext(file)[1] != ".npz":
+        return False
+    with np.load(file) as z:
+        return "ptr" in z
+
+
+# Routine to return the (source name, index in the ensemble, matrix) of each
+# matrix in the files.  The matrix is the file name, so that the worker reads
+# it, or, for a matrix of an ensemble, its triplets.
+
+
+def iter_matrices(files):
+    for file in files:
+        if _is_ensemble(file):
+            for k, triplets in enumerate(mg.iter_matrix_triplets(file)):
+                yield file, k, tuple(np.array(t) for t in triplets)
+        else:
+            yield file, None, file
+
+
+# Routine to run one job, a (source name, index, matrix, method, scc) tuple,
+# in a worker process.  Errors are returned in the result rather than raised.
+
+
+def run_job(job):
+
+    name, index, source, method, scc = job
+
+    result = {"source": name, "index": index}
+
+    t_start = time.perf_counter()
+
+    try:
+        result.update(dt.compute(source, method=method, scc=scc))
+    except Exception as e:
+        result["method"] = method
+        result["error"] = "{:s}: {:s}".format(type(e).__name__, str(e))
+
+    result["time"] = time.perf_counter() - t_start
+
+    return result
+
+
+def _error(job, error, t):
+    name, index, source, method, scc = job
+    return {
+        "source": name,
+        "index": index,
+        "method": method,
+        "time": t,
+        "error": error,
+    }
+
+
+# Routine run by a worker process, which receives chunks of jobs and sends
+# back the result of each job as it is done
+
+
+def _serve(conn):
+    while True:
+        jobs = conn.recv()
+        if jobs is None:
+            break
+        for job in jobs:
+            conn.send(run_job(job))
+
+
+# Class for a worker process with the (number, job) pairs of its chunk that
+# are not yet done and the deadline of the job it is running
+
+
+class _Worker:
+    def __init__(self):
+        self.conn, child = mp.Pipe()
+        self.process = mp.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.jobs = deque()
+        self.t_start = None
+
+    def send(self, chunk):
+        self.jobs.extend(chunk)
+        self.conn.send([job for k, job in chunk])
+        self.t_start = time.perf_counter()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+# Generator of the results of the jobs, in order, from a pool of workers.  The
+# jobs are sent in chunks of chunksize, with at most window chunks taken and
+# not yet written, so that only those jobs (and, for an ensemble, their
+# triplets) are in memory at a time.  A worker whose job runs past timeout
+# seconds, or that dies, is stopped and replaced, and the rest of its chunk
+# is sent again.
+
+
+def iter_results(jobs, workers=None, chunksize=1, timeout=None, window=None):
+
+    workers = workers or os.cpu_count() or 1
+    window = (window or 4 * workers) * chunksize
+    jobs = enumerate(jobs)
+    retry = deque()
+    results = {}
+    n_taken, n_done = 0, 0
+
+    pool = [_Worker() for _ in range(workers)]
+
+    try:
+        while True:
+
+            for w in pool:
+                if not w.jobs:
+                    chunk = [
+                        retry.popleft()
+                        for _ in range(min(chunksize, len(retry)))
+                    ]
+                    if not chunk and n_taken - n_done < window:
+                        chunk = list(islice(jobs, chunksize))
+                        n_taken += len(chunk)
+                    if chunk:
+                        w.send(chunk)
+
+            busy = [w for w in pool if w.jobs]
+            if not busy:
+                break
+
+            wait_time = None
+            if timeout:
+                t_first = min(w.t_start for w in busy)
+                wait_time = max(t_first + timeout - time.perf_counter(), 0)
+            ready = wait([w.conn for w in busy], wait_time)
+
+            for i, w in enumerate(pool):
+                if not w.jobs:
+                    continue
+                if w.conn in ready:
+                    try:
+                        result = w.conn.recv()
+                    except EOFError:
+                        result = None
+                    k, job = w.jobs.popleft()
+                    if result is not None:
+                        results[k] = result
+                        w.t_start = time.perf_counter()
+                        continue
+                    error = "WorkerError: the worker process died"
+                elif timeout and time.perf_counter() - w.t_start >= timeout:
+                    k, job = w.jobs.popleft()
+                    error = "TimeoutError: time limit reached"
+                else:
+                    continue
+                results[k] = _error(
+                    job, error, time.perf_counter() - w.t_start
+                )
+                retry.extendleft(reversed(w.jobs))
+                w.stop()
+                pool[i] = _Worker()
+
+            while n_done in results:
+                yield results.pop(n_done)
+                n_done += 1
+
+    finally:
+        for w in pool:
+            w.stop()
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="batch_determinant",
+        description="Compute the determinants of a collection of matrices on a pool of processes",
+    )
+
+    parser.add_argument(
+        "inputs",
+        metavar="inputs",
+        type=str,
+        nargs="*",
+        help="matrix files, directories of matrix files, or glob patterns",
+    )
+
+    parser.add_argument(
+        "--manifest",
+        metavar="manifest",
+        type=str,
+        help="text file listing one matrix file per line",
+    )
+
+    parser.add_argument(
+        "--method",
+        metavar="method",
+        type=str,
+        nargs="+",
+        choices=dt.METHODS,
+        default=["lu"],
+        help="methods to run on each matrix: "
+        + ", ".join(dt.METHODS)
+        + " (default: lu)",
+    )
+
+    parser.add_argument(
+        "--scc",
+        action="store_true",
+        help="compute the determinants over the strongly connected components",
+    )
+
+    parser.add_argument(
+        "--workers",
+        metavar="workers",
+        type=int,
+        help="number of worker processes (default: the number of cpus)",
+    )
+
+    parser.add_argument(
+        "--timeout",
+        metavar="timeout",
+        type=float,
+        help="time limit in seconds for each job (default: none)",
+    )
+
+    parser.add_argument(
+        "--chunksize",
+        metavar="chunksize",
+        type=int,
+        default=1,
+        help="number of jobs sent to a worker at a time (default: 1)",
+    )
+
+    parser.add_argument(
+        "--output",
+        metavar="output",
+        type=str,
+        help="output file, CSV for a .csv extension and JSON lines otherwise (default: JSON lines to standard output)",
+    )
+
+    args = parser.parse_args(argv)
+
+    files = matrix_files(args.inputs, args.manifest)
+
+    if not files:
+        parser.error("no matrix files found")
+
+    jobs = (
+        (name, index, source, method, args.scc)
+        for name, index, source in iter_matrices(files)
+        for method in args.method
+    )
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+
+    if args.output and os.path.splitext(args.output)[1] == ".csv":
+        writer = csv.DictWriter(out, FIELDS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        write = lambda result: out.write(dt.to_json(result) + "\n")
+
+    n_jobs, n_errors = 0, 0
+    t_start = time.perf_counter()
+
+    for result in iter_results(
+        jobs, args.workers, args.chunksize, args.timeout
+    ):
+        write(result)
+        n_jobs += 1
+        n_errors += "error" in result
+
+    if args.output:
+        out.close()
+
+    print(
+        "Jobs = {:d}, Errors = {:d}, Time = {:.2f} s".format(
+            n_jobs, n_errors, time.perf_counter() - t_start
+        ),
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code writes and reads the checkpoints of long enumerations, so that a
+# stopped run can be resumed.  A checkpoint is a pickled dict of the state of
+# the enumeration and of its sums, along with a key for the run (the matrix
+# file and the options that fix the enumeration), which must match on
+# resuming.  The checkpoint is written to a temporary file that then replaces
+# the checkpoint file, so a run stopped while writing leaves the previous
+# checkpoint intact.
+
+import os
+import time
+import pickle
+
+
+def save(file, data):
+    tmp = file + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, file)
+
+
+def load(file):
+    with open(file, "rb") as f:
+        return pickle.load(f)
+
+
+# Class that writes a checkpoint once at least interval seconds have passed
+# since the last one
+
+
+class Checkpointer:
+    def __init__(self, file, interval, key):
+        self.file = file
+        self.interval = interval
+        self.key = key
+        self.t_next = time.perf_counter() + interval
+
+    def due(self):
+        return time.perf_counter() >= self.t_next
+
+    def save(self, data):
+        save(self.file, dict(data, key=self.key))
+        self.t_next = time.perf_counter() + self.interval
+
+    # Routine to return the data of the checkpoint, which must be for the
+    # same run
+
+    def load(self):
+        data = load(self.file)
+        if data.get("key") != self.key:
+            raise ValueError(
+                f"Checkpoint {self.file} is for a different run: "
+                f"{data.get('key')}."
+            )
+        return data
@@ -21,123 +21,467 @@
 # //////////////////////////////////////////////////////////////////////////////
 
 import os
+import time
 import glob
 import argparse
 from itertools import islice
 import numpy as np
-import networkx as nx
 import matrix_graph as mg
+import arborescence as ab
+import sampling as sp
+import scc
+import checkpoint as ck
+import render as rd
 
+# Routine to return an iterator over the branchings as (parent array, log
+# weight, sign) triples.  If ordered, they are in decreasing order of the
+# absolute value of their weight.  state is the enumeration state, for
+# checkpointing.
 
-def k_branchings(G, k, weight="lweight"):
-    if k:
-        return list(
-            islice(nx.ArborescenceIterator(G, weight=weight, minimum=False), k)
-        )
+
+def k_branchings(D, k, ordered=True, state=None):
+    if ordered:
+        branchings = ab.iter_best_arborescences(D, state)
     else:
-        return list(nx.ArborescenceIterator(G, weight=weight, minimum=False))
-
-
-parser = argparse.ArgumentParser(
-    prog="branching_det",
-    description="Compute a matrix determinant from branchings in the matrix digraph",
-)
-
-parser.add_argument("file", metavar="file", type=str, help="matrix text file")
-parser.add_argument(
-    "--k",
-    metavar="k",
-    type=int,
-    help="maximum number of branchings to include (default is all branchings)",
-)
-parser.add_argument(
-    "--output_dir",
-    metavar="output_dir",
-    type=str,
-    help="output directory for branching graph pdfs)",
-)
-parser.add_argument(
-    "--prec",
-    metavar="prec",
-    type=int,
-    default=2,
-    help="precision for outputting arc and branching weights",
-)
-parser.add_argument(
-    "--write_graph",
-    action="store_true",
-    help="output the graph",
-)
-parser.add_argument(
-    "--compare",
-    action="store_true",
-    help="compare determinant to that computed by LU decomposition",
-)
-
-args = parser.parse_args()
-
-# Create graph
-
-G = mg.create_graph_from_matrix_file(args.file)
-
-# Compute branchings and print out results
-
-if args.output_dir:
-    if not os.path.exists(args.output_dir):
-        os.makedirs(args.output_dir)
+        branchings = ab.iter_arborescences(D, state)
+    if k:
+        return islice(branchings, k)
     else:
-        files = glob.glob(args.output_dir + "/*")
-        for f in files:
-            os.remove(f)
-    if args.write_graph:
-        A = nx.nx_agraph.to_agraph(G)
-        A.edge_attr["color"] = "black"
-        for u, v, d in G.edges(data=True):
-            A.get_edge(u, v).attr["label"] = "{:.0f}".format(d["weight"])
-        A.layout(prog="dot")
-        A.draw(args.output_dir + "/graph.pdf")
-else:
-    print("Branchings\n")
-
-i = 0
-sum = 0
-branchings = k_branchings(G, args.k)
-
-for b in branchings:
-    w = 1
-    for u, v, d in b.edges(data=True):
-        w *= d["weight"]
-    sum += w
+        return branchings
+
+
+def branching_arcs(p):
+    return [(int(u), v) for v, u in enumerate(p, start=1)]
+
+
+# Routine to return the drawing attributes of an arc, in red if it is one of
+# the given branching arcs
+
+
+def arc_attributes(u, v, d, prec, arcs=()):
+    attr = {"label": "{:.{prec}f}".format(d["weight"], prec=prec)}
+    if (u, v) in arcs:
+        attr.update(color="red", fontcolor="red")
+    return attr
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="branching_det",
+        description="Compute a matrix determinant from branchings in the matrix digraph",
+    )
+
+    parser.add_argument(
+        "file", metavar="file", type=str, help="matrix text file"
+    )
+    parser.add_argument(
+        "--k",
+        metavar="k",
+        type=int,
+        help="maximum number of branchings to include (default is all branchings)",
+    )
+    parser.add_argument(
+        "--output_dir",
+        metavar="output_dir",
+        type=str,
+        help="output directory for branching graph pdfs)",
+    )
+    parser.add_argument(
+        "--prec",
+        metavar="prec",
+        type=int,
+        default=2,
+        help="precision for outputting arc and branching weights",
+    )
+    parser.add_argument(
+        "--write_graph",
+        action="store_true",
+        help="output the graph",
+    )
+    parser.add_argument(
+        "--format",
+        metavar="format",
+        choices=["pdf", "svg"],
+        default="pdf",
+        help="format of the branching graphs, pdf or svg (default is pdf)",
+    )
+    parser.add_argument(
+        "--single_file",
+        metavar="single_file",
+        type=str,
+        help="write the branching graphs to this single file in output_dir (a multi-page pdf, which requires pypdf, or an html page of svgs)",
+    )
+    parser.add_argument(
+        "--render_workers",
+        metavar="render_workers",
+        type=int,
+        help="number of processes for rendering the branching graphs (default is the number of cpus)",
+    )
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="also sum the branching weights in exact rational arithmetic",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="do not print the individual branchings",
+    )
+    parser.add_argument(
+        "--rtol",
+        metavar="rtol",
+        type=float,
+        help="stop when the branching sum is within this relative tolerance of the LU determinant",
+    )
+    parser.add_argument(
+        "--time_limit",
+        metavar="time_limit",
+        type=float,
+        help="stop the branching sum after this many seconds",
+    )
+    parser.add_argument(
+        "--progress",
+        metavar="progress",
+        type=float,
+        default=1.0,
+        help="seconds between progress reports with rtol or time_limit (default is 1)",
+    )
+    parser.add_argument(
+        "--samples",
+        metavar="samples",
+        type=int,
+        help="estimate the determinant from this number of randomly sampled branchings",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="batch",
+        type=int,
+        default=1000,
+        help="number of branchings sampled per batch (default is 1000)",
+    )
+    parser.add_argument(
+        "--seed",
+        metavar="seed",
+        type=int,
+        help="random number seed for sampling",
+    )
+    parser.add_argument(
+        "--confidence",
+        metavar="confidence",
+        type=float,
+        default=0.95,
+        help="confidence level of the sampling interval (default is 0.95)",
+    )
+    parser.add_argument(
+        "--save_branchings",
+        metavar="save_branchings",
+        type=str,
+        help="file (.npz or .npy) in which to save the branchings as parent arrays",
+    )
+    parser.add_argument(
+        "--scc",
+        action="store_true",
+        help="sum the branchings separately over the strongly connected components",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="checkpoint",
+        type=str,
+        help="file in which to checkpoint the branching sum",
+    )
+    parser.add_argument(
+        "--checkpoint_interval",
+        metavar="checkpoint_interval",
+        type=float,
+        default=600,
+        help="seconds between checkpoints (default is 600)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="resume the branching sum from the checkpoint file",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="compare determinant to that computed by LU decomposition",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+
+    if args.checkpoint and (args.output_dir or args.samples or args.scc):
+        parser.error(
+            "--checkpoint cannot be used with --output_dir, --samples, or --scc"
+        )
+
+    if args.scc and (args.output_dir or args.samples or args.k):
+        parser.error(
+            "--scc cannot be used with --output_dir, --samples, or --k"
+        )
+
+    # Create graph
+
+    D = mg.create_matrix_digraph_from_file(args.file)
+
     if args.output_dir:
-        A = nx.nx_agraph.to_agraph(G)
-        A.edge_attr["color"] = "black"
-        for u, v, d in G.edges(data=True):
-            A.get_edge(u, v).attr["label"] = "{:.{prec}f}".format(
-                d["weight"], prec=args.prec
+        G = D.to_graph()
+        pos = rd.layout(G)
+
+    # With a tolerance or time limit, the branchings are summed in decreasing
+    # order of the absolute value of their weight until the sum is within the
+    # tolerance of the LU determinant or the time runs out.  The residual is
+    # relative to the LU determinant and is computed from the logs, so that
+    # it does not overflow for large determinants.
+
+    anytime = args.rtol is not None or args.time_limit is not None
+
+    if anytime or args.compare:
+        lu_sign, lu_log = mg.compute_LU_slogdet_from_graph(D)
+
+    # Estimate the determinant from sampled branchings, if desired.  With the
+    # scc option, the determinant is the product of the branching sums of the
+    # diagonal blocks.  Otherwise, compute branchings and print out results
+
+    if args.samples:
+        if not sp.mixed_signs(D):
+            print(
+                "Note: the arc weights all have the same sign, so the "
+                "estimate is the LU determinant with no sampling error.\n"
+            )
+        print("Sampled branchings\n")
+        for count, est, half in sp.iter_estimates(
+            D, args.samples, args.batch, args.seed, args.confidence
+        ):
+            print(
+                "{:d}: Estimate = {:s} +/- {:s}".format(
+                    count,
+                    mg.format_slog(*est, args.prec),
+                    mg.format_slog(*half, args.prec),
+                )
+            )
+        print(
+            "\nDeterminant by sampling = {:s} +/- {:s} ({:g}% confidence)\n".format(
+                mg.format_slog(*est, args.prec),
+                mg.format_slog(*half, args.prec),
+                100 * args.confidence,
+            )
+        )
+    elif args.scc:
+        print("Blocks\n")
+        i = 1
+        sign, log = 1.0, 0.0
+        blocks = scc.blocks(D)
+        for b, B in enumerate(blocks, start=1):
+            total = mg.LogSum()
+            n_b = 0
+            for p, lw, sg in k_branchings(B, None, ordered=False):
+                total.add(lw, sg)
+                n_b += 1
+            s_b, l_b = total.slog()
+            print(
+                "Block {:d} {}: Branchings = {:d}, Determinant = {:s}".format(
+                    b,
+                    B.ids[1:].tolist(),
+                    n_b,
+                    mg.format_slog(s_b, l_b, args.prec),
+                )
+            )
+            sign *= s_b
+            log += l_b
+            i *= n_b
+
+        print("\nNumber of blocks = {:d}\n".format(len(blocks)))
+        print(
+            "\nNumber of branchings (product over blocks) = {:d}\n".format(i)
+        )
+        print(
+            "\nDeterminant by branchings = {:s}\n".format(
+                mg.format_slog(sign, log, args.prec)
             )
-        for u, v, d in b.edges(data=True):
-            A.get_edge(u, v).attr["color"] = "red"
-            A.get_edge(u, v).attr["fontcolor"] = "red"
-        A.graph_attr["label"] = "Branching weight = {:.{prec}f}".format(
-            w, prec=args.prec
         )
-        A.graph_attr["fontcolor"] = "red"
-        A.layout(prog="dot")
-        A.draw(args.output_dir + "/" + str(i) + ".pdf")
-        i += 1
     else:
-        print(b.edges, ": Weight = {:.{prec}f}".format(w, prec=args.prec))
+        if args.output_dir:
+            if not os.path.exists(args.output_dir):
+                os.makedirs(args.output_dir)
+            else:
+                files = glob.glob(args.output_dir + "/*")
+                for f in files:
+                    os.remove(f)
+            renderer = rd.Renderer(
+                pos,
+                fmt=args.format,
+                workers=args.render_workers,
+                single_file=args.single_file
+                and os.path.join(args.output_dir, args.single_file),
+            )
+            if args.write_graph:
+                renderer.add(
+                    rd.figure(
+                        G,
+                        args.output_dir + "/graph." + args.format,
+                        lambda u, v, d: arc_attributes(u, v, d, 0),
+                    )
+                )
+        else:
+            print("Branchings\n")
+
+        # Sum the branching weights as the branchings are generated
 
-print("\nNumber of branchings = {:d}\n".format(len(branchings)))
-print(
-    "\nDeterminant by branchings = {:.{prec}f}\n".format(sum, prec=args.prec)
-)
+        i = 0
+        total = mg.LogSum()
+        exact = mg.ExactSum()
+        saved = ab.ArborescenceArray(D.n) if args.save_branchings else None
+        ordered = bool(args.k or args.output_dir or anytime)
+        state = {}
 
-# Compare to result computed from LU decomposition, if desired
+        # With a checkpoint, the enumeration state and the sums are saved
+        # periodically, and, on resuming, restored from the checkpoint
+
+        if args.checkpoint:
+            checkpointer = ck.Checkpointer(
+                args.checkpoint,
+                args.checkpoint_interval,
+                {
+                    "file": os.path.abspath(args.file),
+                    "ordered": ordered,
+                    "exact": args.exact,
+                    "save_branchings": bool(args.save_branchings),
+                },
+            )
+            if args.resume:
+                try:
+                    data = checkpointer.load()
+                except (OSError, ValueError) as e:
+                    parser.error(str(e))
+                state = data["state"]
+                i, total, exact, saved = (
+                    data["i"],
+                    data["total"],
+                    data["exact"],
+                    data["saved"],
+                )
+                print("Resuming after {:d} branchings\n".format(i))
 
-if args.compare:
-    print(
-        "\nDeterminant by LU decomposition = {:.{prec}f}\n".format(
-            mg.compute_LU_determinant_from_graph(G), prec=args.prec
+        if args.k and i >= args.k:
+            branchings = iter(())
+        else:
+            branchings = k_branchings(
+                D, args.k and args.k - i, ordered=ordered, state=state
+            )
+
+        t_start = time.perf_counter()
+        t_report = t_start + args.progress
+        stop = None
+
+        for p, lw, sg in branchings:
+            total.add(lw, sg)
+            if args.save_branchings:
+                saved.append(p, lw, sg)
+            if args.exact:
+                exact.add_product(
+                    D.arc_weight(u, v) for u, v in branching_arcs(p)
+                )
+            s_w = mg.format_slog(sg, lw, args.prec)
+            if args.output_dir:
+                arcs = set(branching_arcs(p))
+                renderer.add(
+                    rd.figure(
+                        G,
+                        args.output_dir + "/" + str(i) + "." + args.format,
+                        lambda u, v, d: arc_attributes(
+                            u, v, d, args.prec, arcs
+                        ),
+                        {
+                            "label": "Branching weight = " + s_w,
+                            "fontcolor": "red",
+                        },
+                    )
+                )
+            elif not args.quiet:
+                print(branching_arcs(p), ": Weight = " + s_w)
+            i += 1
+
+            if anytime:
+                sign, log = total.slog()
+                if lu_sign:
+                    with np.errstate(over="ignore"):
+                        residual = abs(
+                            1 - sign * lu_sign * np.exp(log - lu_log)
+                        )
+                else:
+                    residual = np.inf if sign else 0.0
+                now = time.perf_counter()
+                if args.rtol is not None and residual <= args.rtol:
+                    stop = "tolerance reached"
+                elif (
+                    args.time_limit is not None
+                    and now - t_start >= args.time_limit
+                ):
+                    stop = "time limit reached"
+                if now >= t_report or stop:
+                    print(
+                        "Terms = {:d}: Partial sum = {:s}, "
+                        "Relative residual = {:.{prec}e}".format(
+                            i,
+                            mg.format_slog(sign, log, args.prec),
+                            residual,
+                            prec=args.prec,
+                        )
+                    )
+                    t_report = now + args.progress
+                if stop:
+                    break
+
+            if args.checkpoint and checkpointer.due():
+                checkpointer.save(
+                    {
+                        "state": state,
+                        "i": i,
+                        "total": total,
+                        "exact": exact,
+                        "saved": saved,
+                    }
+                )
+
+        if stop:
+            print("\nStopped: {:s}".format(stop))
+
+        # Wait for the last of the graphs, all drawn with the layout of the
+        # full graph
+
+        if args.output_dir:
+            renderer.close()
+
+        if args.save_branchings:
+            saved.save(args.save_branchings)
+
+        print("\nNumber of branchings = {:d}\n".format(i))
+        print(
+            "\nDeterminant by branchings = {:s}\n".format(
+                mg.format_slog(*total.slog(), args.prec)
+            )
         )
-    )
+
+        if args.exact:
+            print(
+                "\nExact determinant by branchings = {:s}\n".format(
+                    mg.format_fraction(exact.value(), args.prec)
+                )
+            )
+
+    # Compare to result computed from LU decomposition, if desired
+
+    if args.compare:
+        print(
+            "\nDeterminant by LU decomposition = {:s}\n".format(
+                mg.format_slog(lu_sign, lu_log, args.prec)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -22,60 +22,104 @@
 
 import argparse
 import matrix_graph as mg
+import tridiag as td
 
-parser = argparse.ArgumentParser(
-    prog="branching_det",
-    description="Compute the determinant for a tridiagonal matrix",
-)
 
-parser.add_argument(
-    "--prec",
-    metavar="prec",
-    type=int,
-    default=2,
-    help="precision for output",
-)
+def main(argv=None):
 
-parser.add_argument(
-    "--compare",
-    action="store_true",
-    help="compare determinant to that computed by LU decomposition",
-)
+    parser = argparse.ArgumentParser(
+        prog="branching_det",
+        description="Compute the determinant for a tridiagonal or banded matrix",
+    )
+
+    parser.add_argument(
+        "--prec",
+        metavar="prec",
+        type=int,
+        default=2,
+        help="precision for output",
+    )
 
+    parser.add_argument(
+        "--minors",
+        action="store_true",
+        help="also print the leading principal minors (tridiagonal matrices only)",
+    )
 
-parser.add_argument("file", metavar="file", type=str, help="matrix text file")
+    parser.add_argument(
+        "--block_size",
+        metavar="block_size",
+        type=int,
+        help="block size for block-tridiagonal matrices (default is the bandwidth)",
+    )
 
-args = parser.parse_args()
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="compare determinant to that computed by LU decomposition",
+    )
 
-# Create graph
+    parser.add_argument(
+        "file", metavar="file", type=str, help="matrix text file"
+    )
 
-G = mg.create_graph_from_matrix_file(args.file)
+    args = parser.parse_args(argv)
 
-# Check that tridiagonal
+    # Create graph
 
-for u, v in G.edges():
-    if u > 0:
-        assert (
-            abs(u - v) <= 1
-        ), f"Arc ({u}, {v}) should not be in tridiagonal graph."
+    D = mg.create_matrix_digraph_from_file(args.file)
 
-# Compute determinant recursively
+    # Compute the determinant recursively, by the tridiagonal recursion for
+    # bandwidth one and by the block recursion otherwise
 
-d = G[0][1]["weight"]
-d_tilde = 1
+    b = td.bandwidth(D)
 
-for i in range(1, G.number_of_nodes() - 1):
-    dp = (G[i][i + 1]["weight"] + G[0][i + 1]["weight"]) * d + G[0][i + 1][
-        "weight"
-    ] * G[i + 1][i]["weight"] * d_tilde
-    d_tilde = d + G[i + 1][i]["weight"] * d_tilde
-    d = dp
+    if args.block_size is not None and args.block_size < max(b, 1):
+        parser.error(
+            f"--block_size must be at least the bandwidth ({max(b, 1)})"
+        )
 
-print(f"\nDeterminant by recursion: {d:.{args.prec}f}")
+    tridiagonal = args.block_size is None and b <= 1 or args.block_size == 1
 
-# Compare to result computed from LU decomposition, if desired
+    if args.minors and not tridiagonal:
+        parser.error(
+            "--minors requires a tridiagonal matrix and block size one "
+            f"(the bandwidth is {b})"
+        )
 
-if args.compare:
-    print(
-        f"\nDeterminant by LU decomposition = {mg.compute_LU_determinant_from_graph(G):.{args.prec}f}\n"
-    )
+    if tridiagonal:
+        sign, log = td.leading_minors(*td.arrays_from_digraph(D), log=True)
+
+        if args.minors:
+            print("\nLeading principal minors:\n")
+            for i, (s, l) in enumerate(zip(sign[0], log[0]), start=1):
+                print(f"{i}: {mg.format_slog(s, l, args.prec)}")
+
+        print(
+            "\nDeterminant by recursion: "
+            f"{mg.format_slog(sign[0, -1], log[0, -1], args.prec)}"
+        )
+
+    else:
+        block_size = args.block_size or b
+        sign, log = td.block_determinants(
+            *td.block_arrays_from_digraph(D, block_size), log=True
+        )
+
+        print(
+            f"\nDeterminant by block recursion (bandwidth {b}, block size "
+            f"{block_size}): {mg.format_slog(sign[0], log[0], args.prec)}"
+        )
+
+    # Compare to result computed from LU decomposition, if desired
+
+    if args.compare:
+        lu_sign, lu_log = mg.compute_LU_slogdet_from_graph(D)
+        print(
+            "\nDeterminant by LU decomposition = "
+            f"{mg.format_slog(lu_sign, lu_log, args.prec)}\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -20,63 +20,200 @@
 #
 # //////////////////////////////////////////////////////////////////////////////
 
+import os
+import sys
 import argparse
 import numpy as np
 
-rng = np.random.default_rng()
-
-parser = argparse.ArgumentParser(
-    prog="create_random_matrix",
-    description="Create a random matrix with negative off-diagonal elements and a non-zero column sum",
-)
-
-parser.add_argument(
-    "N",
-    metavar="N",
-    type=int,
-    help="Number of rows/columns in matrix",
-)
-
-parser.add_argument(
-    "--x_max",
-    metavar="x_max",
-    type=float,
-    default=1,
-    help="maximum absolute value of off-diagonal element",
-)
-
-parser.add_argument(
-    "--fixed_col_sum",
-    metavar="fixed_col_sum",
-    type=float,
-    default=None,
-    help="fixed value for each column (default: not set)",
-)
-
-parser.add_argument(
-    "--tridiag",
-    action="store_true",
-    help="tridiagonal matrix",
-)
-
-args = parser.parse_args()
-
-A = np.zeros((args.N, args.N))
-
-for i in range(A.shape[0]):
-    for j in range(A.shape[1]):
-        if i == j:
-            if args.fixed_col_sum:
-                A[i, j] += args.fixed_col_sum
-            else:
-                A[i, j] += args.x_max * rng.random()
+# Routine to return the 1-based (row, col, data) triplets of a random matrix,
+# sorted by row and then column.  The off-diagonal positions are all the
+# positions, those next to the diagonal (tridiag), or a random subset with
+# each position kept with probability density.  The off-diagonal elements are
+# -x_max times a uniform deviate, and the column sum is fixed_col_sum or
+# x_max times a uniform deviate.
+
+
+def random_matrix_triplets(
+    rng, N, x_max=1, fixed_col_sum=None, tridiag=False, density=None
+):
+
+    M = N * (N - 1)
+
+    if tridiag:
+        k = np.arange(N - 1)
+        i = np.concatenate((k, k + 1))
+        j = np.concatenate((k + 1, k))
+        if density is not None:
+            keep = rng.random(len(i)) < density
+            i, j = i[keep], j[keep]
+    else:
+        if density is None:
+            k = np.arange(M)
         else:
-            if (args.tridiag and abs(i - j) <= 1) or not args.tridiag:
-                aij = args.x_max * rng.random()
-                A[i, j] -= aij
-                A[j, j] += aij
-
-for i in range(A.shape[0]):
-    for j in range(A.shape[1]):
-        if A[i, j]:
-            print(i + 1, j + 1, A[i, j])
+            k = rng.choice(M, rng.binomial(M, density), replace=False)
+        i = k // (N - 1)
+        j = k % (N - 1)
+        j += j >= i
+
+    a = x_max * rng.random(len(i))
+
+    if fixed_col_sum:
+        diag = np.full(N, float(fixed_col_sum))
+    else:
+        diag = x_max * rng.random(N)
+    diag += np.bincount(j, weights=a, minlength=N)
+
+    v = np.arange(N)
+    row = np.concatenate((i, v))
+    col = np.concatenate((j, v))
+    data = np.concatenate((-a, diag))
+
+    keep = data != 0
+    row, col, data = row[keep], col[keep], data[keep]
+
+    order = np.lexsort((col, row))
+
+    return row[order] + 1, col[order] + 1, data[order]
+
+
+# Routine to write triplets as text, one "i j a_ij" line per triplet.  The
+# lines are formatted a chunk at a time with a single format string, which
+# is much faster than formatting them one at a time.
+
+
+def write_triplets(f, row, col, data, chunk=65536):
+    for k in range(0, len(data), chunk):
+        values = [
+            x
+            for t in zip(
+                row[k : k + chunk].tolist(),
+                col[k : k + chunk].tolist(),
+                data[k : k + chunk].tolist(),
+            )
+            for x in t
+        ]
+        f.write("%d %d %.17g\n" * (len(values) // 3) % tuple(values))
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="create_random_matrix",
+        description="Create a random matrix with negative off-diagonal elements and a non-zero column sum",
+    )
+
+    parser.add_argument(
+        "N",
+        metavar="N",
+        type=int,
+        help="Number of rows/columns in matrix",
+    )
+
+    parser.add_argument(
+        "--x_max",
+        metavar="x_max",
+        type=float,
+        default=1,
+        help="maximum absolute value of off-diagonal element",
+    )
+
+    parser.add_argument(
+        "--fixed_col_sum",
+        metavar="fixed_col_sum",
+        type=float,
+        default=None,
+        help="fixed value for each column (default: not set)",
+    )
+
+    parser.add_argument(
+        "--tridiag",
+        action="store_true",
+        help="tridiagonal matrix",
+    )
+
+    parser.add_argument(
+        "--density",
+        metavar="density",
+        type=float,
+        default=None,
+        help="probability that an off-diagonal element is nonzero (default: 1)",
+    )
+
+    parser.add_argument(
+        "--count",
+        metavar="count",
+        type=int,
+        default=1,
+        help="number of matrices to create (default: 1)",
+    )
+
+    parser.add_argument(
+        "--seed",
+        metavar="seed",
+        type=int,
+        default=None,
+        help="random number seed (default: not set)",
+    )
+
+    parser.add_argument(
+        "--output",
+        metavar="output",
+        type=str,
+        default=None,
+        help="output file, with a .npz extension for binary output (default: standard output)",
+    )
+
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+
+    matrices = (
+        random_matrix_triplets(
+            rng,
+            args.N,
+            x_max=args.x_max,
+            fixed_col_sum=args.fixed_col_sum,
+            tridiag=args.tridiag,
+            density=args.density,
+        )
+        for k in range(args.count)
+    )
+
+    # Write the matrices.  An ensemble of matrices in a .npz file holds the
+    # concatenated triplets, with those of matrix k at ptr[k]:ptr[k + 1].  An
+    # ensemble in text form goes to one file per matrix, numbered from zero.
+
+    if args.output is None:
+        if args.count > 1:
+            parser.error("--count greater than one requires --output")
+        write_triplets(sys.stdout, *next(matrices))
+
+    elif os.path.splitext(args.output)[1] == ".npz":
+        triplets = list(matrices)
+        ptr = np.cumsum([0] + [len(t[0]) for t in triplets])
+        if args.count == 1:
+            row, col, data = triplets[0]
+            np.savez(args.output, row=row, col=col, data=data)
+        else:
+            np.savez(
+                args.output,
+                row=np.concatenate([t[0] for t in triplets]),
+                col=np.concatenate([t[1] for t in triplets]),
+                data=np.concatenate([t[2] for t in triplets]),
+                ptr=ptr,
+                n=np.full(args.count, args.N),
+            )
+
+    else:
+        stem, ext = os.path.splitext(args.output)
+        for k, triplets in enumerate(matrices):
+            if args.count > 1:
+                file = f"{stem}_{k}{ext}"
+            else:
+                file = args.output
+            with open(file, "w") as f:
+                write_triplets(f, *triplets)
+
+
+if __name__ == "__main__":
+    main()
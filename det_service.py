@@ -0,0 +1,135 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code runs a long-lived determinant service, so that a stream of
+# matrices costs one interpreter start and one set of imports.  Each job is
+# one line of JSON with the matrix given by one of
+#
+#   "file"      the name of a matrix file
+#   "matrix"    a square dense matrix, as a list of rows
+#   "triplets"  a list of [i, j, a_ij] triplets, with 1-based indices
+#
+# and optional "id", "method" (default "lu"), "scc", and "block_size" entries.
+# Each result is one line of JSON with the id, method, sign, log of the
+# absolute value, determinant, number of terms, and time in seconds, or with
+# the id and an error message.  The jobs are read from standard input, or
+# from the connections to a Unix socket.
+
+import sys
+import json
+import time
+import argparse
+import socketserver
+import numpy as np
+import determinant as dt
+
+# Routine to return the result of a job, given as a line of JSON, as a line
+# of JSON
+
+
+def handle(line):
+
+    result = {}
+
+    try:
+        job = json.loads(line)
+        result["id"] = job.get("id")
+
+        if "file" in job:
+            source = job["file"]
+        elif "matrix" in job:
+            source = np.array(job["matrix"], dtype=float)
+        elif "triplets" in job:
+            source = tuple(
+                np.array(job["triplets"], dtype=float).reshape(-1, 3).T
+            )
+        else:
+            raise ValueError("A job needs a file, matrix, or triplets entry.")
+
+        t_start = time.perf_counter()
+        result.update(
+            dt.compute(
+                source,
+                method=job.get("method", "lu"),
+                scc=job.get("scc", False),
+                block_size=job.get("block_size"),
+            )
+        )
+        result["time"] = time.perf_counter() - t_start
+
+    except Exception as e:
+        result["error"] = "{:s}: {:s}".format(type(e).__name__, str(e))
+
+    return dt.to_json(result)
+
+
+# Routine to answer the jobs read from a stream, one line each
+
+
+def serve_stream(f_in, f_out):
+    for line in f_in:
+        if line.strip():
+            f_out.write(handle(line) + "\n")
+            f_out.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write((handle(line) + "\n").encode())
+                self.wfile.flush()
+
+
+# Routine to answer the jobs on the connections to a Unix socket, each
+# connection in its own thread
+
+
+def serve_socket(path):
+    with socketserver.ThreadingUnixStreamServer(path, _Handler) as server:
+        server.serve_forever()
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="det_service",
+        description="Compute determinants of a stream of matrices given as JSON lines",
+    )
+
+    parser.add_argument(
+        "--socket",
+        metavar="socket",
+        type=str,
+        help="path of a Unix socket on which to serve (default: standard input and output)",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.socket:
+        serve_socket(args.socket)
+    else:
+        serve_stream(sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code computes the determinant of a matrix by any of the methods of the
+# command-line codes, for use from other python code.  The methods are
+#
+#   lu           LU decomposition
+#   tridiagonal  tridiagonal (or block-tridiagonal) recursion
+#   branchings   sum over the arborescences of the matrix digraph
+#   sequential   sum over the fully isolated graphs of sequential rooting
+#   partitioned  sum over the fully isolated graphs of partitioned rooting
+#
+# networkx is only imported by the rooting methods.
+
+import json
+import math
+import numpy as np
+import matrix_graph as mg
+import scc as sc
+
+METHODS = ["lu", "tridiagonal", "branchings", "sequential", "partitioned"]
+
+# Routine to return the array form of the matrix digraph of a source, which
+# may be a matrix file, a matrix digraph in its array or networkx form, a
+# square matrix, or a (row, col, data) triplet of arrays with 1-based indices
+
+
+def as_matrix_digraph(source):
+
+    if isinstance(source, mg.MatrixDigraph):
+        return source
+    if isinstance(source, str):
+        return mg.create_matrix_digraph_from_file(source)
+    if hasattr(source, "edges"):
+        return mg.MatrixDigraph.from_graph(source)
+    if isinstance(source, tuple) and len(source) == 3:
+        return mg.MatrixDigraph.from_triplets(*source)
+
+    return mg.MatrixDigraph.from_matrix(source)
+
+
+def _slog(value):
+    with np.errstate(divide="ignore"):
+        return float(np.sign(value)), float(np.log(np.abs(value)))
+
+
+# Routine to compute the (sign, log of the absolute value) of the determinant
+# and the number of terms (None for lu and tridiagonal) of a matrix digraph
+
+
+def _compute(D, method, block_size):
+
+    if method == "lu":
+        return mg.compute_LU_slogdet_from_graph(D) + (None,)
+
+    if method == "tridiagonal":
+        import tridiag as td
+
+        sign, log = td.banded_determinant(D, block_size, log=True)
+        return sign[0], log[0], None
+
+    if method == "branchings":
+        import arborescence as ab
+
+        total = mg.LogSum()
+        terms = 0
+        for p, lw, sg in ab.iter_arborescences(D):
+            total.add(lw, sg)
+            terms += 1
+        return total.slog() + (terms,)
+
+    if method in ("sequential", "partitioned"):
+        import rootify as rfy
+
+        terms, value = rfy.numeric(D.to_graph(labels=False), method)
+        return _slog(value or 0) + (terms,)
+
+    raise ValueError(
+        f"{method} is not a method; choose one of {', '.join(METHODS)}."
+    )
+
+
+# Routine to compute the determinant of a source by a method.  With scc, the
+# determinant is the product of those of the strongly connected components
+# (for branchings, the number of terms is then the product over the blocks,
+# and for the rooting methods it is the sum of the fully isolated graphs of
+# the blocks).  Returns a dict with the method, sign, log of the absolute
+# value, determinant, and number of terms.
+
+
+def compute(source, method="lu", scc=False, block_size=None):
+
+    D = as_matrix_digraph(source)
+
+    if not scc:
+        sign, log, terms = _compute(D, method, block_size)
+    else:
+        sign, log, terms = 1.0, 0.0, None
+        for B in sc.blocks(D):
+            s, l, t = _compute(B, method, block_size)
+            sign *= s
+            log += l
+            if t is not None:
+                if terms is None:
+                    terms = t
+                elif method == "branchings":
+                    terms *= t
+                else:
+                    terms += t
+
+    sign, log = float(sign), float(log)
+
+    return {
+        "method": method,
+        "sign": sign,
+        "log": log,
+        "determinant": float(sign * np.exp(log)) if sign else 0.0,
+        "terms": terms,
+    }
+
+
+# Routine to return a result as JSON.  Non-finite values, such as the log of
+# a zero determinant, are written as null, since JSON has no infinities.
+
+
+def to_json(result):
+    return json.dumps(
+        {
+            k: None if isinstance(v, float) and not math.isfinite(v) else v
+            for k, v in result.items()
+        },
+        allow_nan=False,
+    )
@@ -20,16 +20,20 @@
 #
 # //////////////////////////////////////////////////////////////////////////////
 
-import networkx as nx
 import glob
 import rootify as rfy
+import polynomial as pl
 import matrix_graph as mg
-import os.path
+import scc
+import checkpoint as ck
+import render as rd
+import os
+import sys
 import argparse
+import operator
 
 
-def num_func(G, data, num, rooted_list):
-    rooted_list.append(G)
+def num_func(G, data, num):
     p = 1
     for u, v, d in G.edges(data=True):
         p *= d["weight"]
@@ -37,131 +41,443 @@ def num_func(G, data, num, rooted_list):
     num[0] += 1
 
 
-def label_func(G, v_det, num, rooted_list):
-    rooted_list.append(G)
-    p = ""
-    i = 0
-    for u, v, d in G.edges(data=True):
-        p += "(" + d["label"] + ")"
-    v_det.append(p)
+def label_func(G, poly, num):
+    poly.add_product([d["label"] for u, v, d in G.edges(data=True)])
     num[0] += 1
 
 
-def label_add_func(G, root, u, v):
-    if G.has_edge(root, v):
-        G.get_edge_data(root, v)["label"] += "+" + G[u][v]["label"]
+# Routine to return the figure of a fully isolated graph, with its weight as
+# the title
+
+
+def figure_func(g, file, calc_type, prec):
+
+    if calc_type == "label":
+        attr_func = lambda u, v, d: {"label": d["label"]}
+        s_w = "".join("(" + d["label"] + ")" for u, v, d in g.edges(data=True))
     else:
-        G.add_edge(root, v, label=G[u][v]["label"])
-
-
-parser = argparse.ArgumentParser(
-    prog="branching_det",
-    description="Factor a matrix determinant via the matrix digraph",
-    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
-)
-
-parser.add_argument("file", metavar="file", type=str, help="matrix text file")
-
-parser.add_argument(
-    "--rooting",
-    metavar="rooting",
-    type=str,
-    choices=["sequential", "partitioned"],
-    default="sequential",
-    help="type of rooting (sequential or partitioned)",
-)
-
-parser.add_argument(
-    "--calc_type",
-    metavar="calc_type",
-    type=str,
-    choices=["label", "numeric"],
-    default="label",
-    help="calculation type (label or numeric)",
-)
-
-parser.add_argument(
-    "--prec",
-    metavar="prec",
-    type=int,
-    default=2,
-    help="precision for numerical output of arc and branching weights",
-)
-
-parser.add_argument(
-    "--output_dir",
-    metavar="output_dir",
-    type=str,
-    help="output directory for pdf files of the fully rooted graphs",
-)
-
-args = parser.parse_args()
-
-if args.output_dir:
-    if not os.path.exists(args.output_dir):
-        os.makedirs(args.output_dir)
+        attr_func = lambda u, v, d: {
+            "label": "{:.{prec}f}".format(d["weight"], prec=prec)
+        }
+        w = 1
+        for u, v, d in g.edges(data=True):
+            w *= d["weight"]
+        s_w = "{:.{prec}f}".format(w, prec=prec)
+
+    return rd.figure(
+        g,
+        file,
+        attr_func,
+        {"label": "Branching weight = " + s_w, "fontcolor": "black"},
+    )
+
+
+# Routine to factor the determinant of a graph with checkpoints, which hold
+# the state of the isolation and the sums so far.  The label terms are added
+# to poly.  If poly is a TermWriter, the checkpoints hold the position in its
+# file, which is cut back to that position on resuming, and otherwise they
+# hold the terms.  Returns the label or numeric determinant and the number of
+# fully isolated graphs.
+
+
+def factor_with_checkpoints(G, args, poly=None):
+
+    checkpointer = ck.Checkpointer(
+        args.checkpoint,
+        args.checkpoint_interval,
+        {
+            "file": os.path.abspath(args.file),
+            "rooting": args.rooting,
+            "calc_type": args.calc_type,
+        },
+    )
+
+    data = {"state": {}}
+    if args.resume:
+        try:
+            data = checkpointer.load()
+        except (OSError, ValueError) as e:
+            exit(str(e))
+        print("\nResuming from {:s}".format(args.checkpoint))
+
+    state = data["state"]
+
+    if args.calc_type == "numeric":
+        n, value = rfy.numeric(
+            G,
+            args.rooting,
+            state=state,
+            checkpoint=lambda state: checkpointer.due()
+            and checkpointer.save({"state": state}),
+        )
+        return value or 0, n
+
+    num = [data.get("num", 0)]
+
+    if isinstance(poly, pl.TermWriter):
+        out = poly.out
+        if args.resume:
+            out.seek(data["offset"])
+            out.truncate()
+            poly.n = num[0]
+
+        def save():
+            out.flush()
+            os.fsync(out.fileno())
+            checkpointer.save(
+                {"state": state, "offset": out.tell(), "num": num[0]}
+            )
+
     else:
-        files = glob.glob(args.output_dir + "/*")
-        for f in files:
-            os.remove(f)
+        poly = data.get("poly", poly)
+
+        def save():
+            checkpointer.save({"state": state, "poly": poly, "num": num[0]})
+
+    for g in rfy.iter_resumable(G, args.rooting, rfy.label_add_func, state):
+        label_func(g, poly, num)
+        if checkpointer.due():
+            save()
 
-# Create graph
+    return poly, num[0]
 
-G = mg.create_graph_from_matrix_file(args.file)
 
-# Set functions
+# Routine to factor the determinant of a graph.  The fully isolated graphs
+# are streamed through the set functions as they are generated, so none of
+# them is kept.  The label terms are added to poly, a ProductSum or a
+# TermWriter.  Returns the label or numeric determinant and the number of
+# fully isolated graphs.
 
-i = 0
-num = [0]
-rooted_list = []
 
-if args.calc_type == "label":
-    v_det = []
-    f = lambda G: label_func(G, v_det, num, rooted_list)
-    if args.rooting == "sequential":
-        rfy.sequential(G, add_func=label_add_func, process_func=f)
+def factor(G, args, poly=None):
+
+    # Set functions.  The figures of the fully isolated graphs are sent to
+    # the renderer, which draws them with the layout of G, as the graphs are
+    # generated.
+
+    num = [0]
+
+    if args.calc_type == "label":
+        f = lambda G: label_func(G, poly, num)
+        add_func = rfy.label_add_func
+    elif args.calc_type == "numeric":
+        det = [0]
+        f = lambda G: num_func(G, det, num)
+        add_func = None
     else:
-        rfy.partitioned(G, add_func=label_add_func, process_func=f)
-    s_det = "\nDeterminant = " + "+".join(det for det in v_det)
-elif args.calc_type == "numeric":
-    det = [0]
-    f = lambda G: num_func(G, det, num, rooted_list)
-    if args.rooting == "sequential":
-        rfy.sequential(G, process_func=f)
+        exit("{:s} is an incorrect calcution type".format(args.calc_type))
+
+    renderer = None
+    if args.output_dir:
+        renderer = rd.Renderer(
+            rd.layout(G),
+            fmt=args.format,
+            workers=args.render_workers,
+            single_file=args.single_file
+            and os.path.join(args.output_dir, args.single_file),
+        )
+
+    def process_func(G):
+        if renderer:
+            renderer.add(
+                figure_func(
+                    G,
+                    "{:s}/out_{:d}.{:s}".format(
+                        args.output_dir, num[0], args.format
+                    ),
+                    args.calc_type,
+                    args.prec,
+                )
+            )
+        f(G)
+
+    if args.memoize:
+        n, value = rfy.memoized(
+            G, args.rooting, args.calc_type, add_func, args.cache_size
+        )
+        if args.calc_type == "label":
+            for p in value.products() if value else []:
+                poly.add_product(p)
+            num[0] = n
+        else:
+            det[0] = value or 0
+            num[0] = n
+    elif args.workers:
+        kwargs = {
+            "rooting": args.rooting,
+            "add_func": add_func,
+            "depth": args.split_depth,
+            "workers": args.workers,
+        }
+        if args.calc_type == "label":
+            for n, terms in rfy.iter_parallel(
+                G, rfy.leaf_terms, operator.iadd, **kwargs
+            ):
+                for p in terms or []:
+                    poly.add_term(p)
+                num[0] += n
+        else:
+            num[0], w = rfy.parallel(G, **kwargs)
+            det[0] = w or 0
+    elif args.checkpoint:
+        value, num[0] = factor_with_checkpoints(G, args, poly)
+        if args.calc_type == "label":
+            poly = value
+        else:
+            det[0] = value
+    elif args.calc_type == "numeric" and not args.output_dir:
+        n, value = rfy.numeric(G, args.rooting)
+        det[0] = value or 0
+        num[0] = n
     else:
-        rfy.partitioned(G, process_func=f)
-    s_det = "\nDeterminant = {:.{prec}f}".format(det[0], prec=args.prec)
-else:
-    exit("{:s} is an incorrect calcution type".format(args.calc_type))
+        if args.rooting == "sequential":
+            leaves = rfy.iter_sequential(G, add_func=add_func)
+        else:
+            leaves = rfy.iter_partitioned(G, add_func=add_func)
+        for g in leaves:
+            process_func(g)
 
-print(s_det + "\n")
+    if renderer:
+        renderer.close()
 
-# Make pdfs
+    if args.calc_type == "label":
+        return poly, num[0]
+    return det[0], num[0]
 
-if args.output_dir:
-    i = 0
 
-    for g in rooted_list:
-        A = nx.nx_agraph.to_agraph(g)
-        A.edge_attr["color"] = "black"
+def main(argv=None):
 
-        if args.calc_type == "label":
-            v_w = []
-            for u, v, d in g.edges(data=True):
-                A.get_edge(u, v).attr["label"] = d["label"]
-                v_w.append("(" + d["label"] + ")")
-            s_w = "".join(w for w in v_w)
+    parser = argparse.ArgumentParser(
+        prog="branching_det",
+        description="Factor a matrix determinant via the matrix digraph",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    parser.add_argument(
+        "file", metavar="file", type=str, help="matrix text file"
+    )
+
+    parser.add_argument(
+        "--rooting",
+        metavar="rooting",
+        type=str,
+        choices=["sequential", "partitioned"],
+        default="sequential",
+        help="type of rooting (sequential or partitioned)",
+    )
+
+    parser.add_argument(
+        "--calc_type",
+        metavar="calc_type",
+        type=str,
+        choices=["label", "numeric"],
+        default="label",
+        help="calculation type (label or numeric)",
+    )
+
+    parser.add_argument(
+        "--prec",
+        metavar="prec",
+        type=int,
+        default=2,
+        help="precision for numerical output of arc and branching weights",
+    )
+
+    parser.add_argument(
+        "--output_dir",
+        metavar="output_dir",
+        type=str,
+        help="output directory for pdf files of the fully rooted graphs",
+    )
+
+    parser.add_argument(
+        "--format",
+        metavar="format",
+        type=str,
+        choices=["pdf", "svg"],
+        default="pdf",
+        help="format of the fully rooted graphs (pdf or svg)",
+    )
+
+    parser.add_argument(
+        "--single_file",
+        metavar="single_file",
+        type=str,
+        help="single file in output_dir for all the fully rooted graphs (a "
+        "multi-page pdf, which requires pypdf, or an html page of svgs)",
+    )
+
+    parser.add_argument(
+        "--render_workers",
+        metavar="render_workers",
+        type=int,
+        help="number of processes for rendering the graphs (default: the number "
+        "of cpus)",
+    )
+
+    parser.add_argument(
+        "--expand",
+        action="store_true",
+        help="expand the label determinant and collect like terms",
+    )
+
+    parser.add_argument(
+        "--label_file",
+        metavar="label_file",
+        type=str,
+        help="file for the label determinant (default: standard output)",
+    )
+
+    parser.add_argument(
+        "--workers",
+        metavar="workers",
+        type=int,
+        help="number of worker processes (default: run in a single process)",
+    )
+
+    parser.add_argument(
+        "--split_depth",
+        metavar="split_depth",
+        type=int,
+        default=1,
+        help="depth at which the rooting is split among the workers",
+    )
+
+    parser.add_argument(
+        "--memoize",
+        action="store_true",
+        help="reuse the results for graphs reached more than once",
+    )
+
+    parser.add_argument(
+        "--cache_size",
+        metavar="cache_size",
+        type=int,
+        default=1000000,
+        help="maximum number of cached graphs for memoization",
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        metavar="checkpoint",
+        type=str,
+        help="file in which to checkpoint the factorization",
+    )
+
+    parser.add_argument(
+        "--checkpoint_interval",
+        metavar="checkpoint_interval",
+        type=float,
+        default=600,
+        help="seconds between checkpoints",
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="resume the factorization from the checkpoint file",
+    )
+
+    parser.add_argument(
+        "--scc",
+        action="store_true",
+        help="factor the strongly connected components separately",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.memoize and (args.output_dir or args.workers):
+        parser.error("--memoize cannot be used with --output_dir or --workers")
+
+    if args.scc and args.output_dir:
+        parser.error("--scc cannot be used with --output_dir")
+
+    # The graphs are drawn on their own pool of processes (see
+    # render_workers), and sending every fully isolated graph back from the
+    # rooting workers would keep them all in memory
+
+    if args.workers and args.output_dir:
+        parser.error(
+            "--workers cannot be used with --output_dir; use --render_workers"
+        )
+
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+
+    if args.checkpoint and (
+        args.memoize or args.workers or args.output_dir or args.scc
+    ):
+        parser.error(
+            "--checkpoint cannot be used with --memoize, --workers, "
+            "--output_dir, or --scc"
+        )
+
+    if args.output_dir:
+        if not os.path.exists(args.output_dir):
+            os.makedirs(args.output_dir)
         else:
-            w = 1
-            for u, v, d in g.edges(data=True):
-                A.get_edge(u, v).attr["label"] = "{:.{prec}f}".format(
-                    d["weight"], prec=args.prec
-                )
-                w *= d["weight"]
-            s_w = "{:.{prec}f}".format(w, prec=args.prec)
-
-        A.graph_attr["label"] = "Branching weight = " + s_w
-        A.graph_attr["fontcolor"] = "black"
-        A.layout(prog="dot")
-        A.draw(args.output_dir + "/out_" + str(i) + ".pdf")
-        i += 1
+            files = glob.glob(args.output_dir + "/*")
+            for f in files:
+                os.remove(f)
+
+    # The label terms are written out as they are found, unless the sum of
+    # products is needed whole: to expand it, to multiply the sums of the
+    # blocks, or to checkpoint the terms when they go to standard output
+
+    label = args.calc_type == "label"
+    held = args.expand or args.scc or args.checkpoint and not args.label_file
+
+    if label:
+        if args.label_file:
+            resume = args.resume and not held
+            out = open(args.label_file, "r+" if resume else "w")
+        else:
+            out = sys.stdout
+        if not held:
+            if not args.resume:
+                out.write("\nDeterminant = ")
+            poly = pl.TermWriter(out)
+        else:
+            poly = pl.ProductSum()
+
+    # Create graph and factor the determinant.  With the scc option, the
+    # determinant is the product of those of the diagonal blocks.
+
+    if args.scc:
+        D = mg.create_matrix_digraph_from_file(args.file)
+        value, n = None, 0
+        for B in scc.blocks(D, labels=label):
+            v_b, n_b = factor(
+                B.to_graph(), args, pl.ProductSum() if label else None
+            )
+            value = v_b if value is None else value * v_b
+            n += n_b
+        if value is None:
+            value = pl.ProductSum() if label else 0
+    else:
+        G = mg.create_graph_from_matrix_file(args.file)
+        value, n = factor(G, args, poly if label else None)
+
+    if label:
+        poly = value.expand() if args.expand else value
+    else:
+        det = [value]
+    num = [n]
+
+    if label:
+        if held:
+            out.write("\nDeterminant = " + poly.to_string())
+        out.write("\n" if args.label_file else "\n\n")
+        if args.label_file:
+            out.close()
+        print(
+            "Number of terms = {:d} (from {:d} fully isolated graphs)\n".format(
+                len(poly), num[0]
+            )
+        )
+    else:
+        print("\nDeterminant = {:.{prec}f}\n".format(det[0], prec=args.prec))
+
+
+if __name__ == "__main__":
+    main()
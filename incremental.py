@@ -0,0 +1,120 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code keeps the determinant of the matrix of a matrix digraph up to date
+# as arc weights change.  Changing the weight of the arc u -> v by delta
+# changes a_uv by -delta and a_vv by +delta, which is the rank-one update
+# delta (e_v - e_u) e_v^T to column v.  Changing the weight of the root arc
+# 0 -> v by delta is the update delta e_v e_v^T.  For an update x y^T, the
+# matrix determinant lemma gives det(A + x y^T) = det(A) (1 + y^T A^-1 x), and
+# the Sherman-Morrison formula updates the inverse in O(N^2) operations.  The
+# determinant and inverse are recomputed from the matrix after every
+# refactor_every updates, or when an update nearly cancels the determinant, to
+# keep rounding errors from building up.
+
+import numpy as np
+import matrix_graph as mg
+
+
+class IncrementalDeterminant:
+    def __init__(self, g, refactor_every=100, tol=1e-8):
+
+        if not isinstance(g, mg.MatrixDigraph):
+            g = mg.MatrixDigraph.from_graph(g)
+
+        self.n = g.n
+        self.refactor_every = refactor_every
+        self.tol = tol
+        self.matrix = g.to_matrix()
+        self.root = g.root.copy()
+        self.refactor()
+
+    # Routine to recompute the determinant and inverse from the matrix
+
+    def refactor(self):
+
+        self.updates = 0
+        self.sign, self.log = np.linalg.slogdet(self.matrix)
+
+        if self.sign == 0:
+            self.inverse = None
+        else:
+            self.inverse = np.linalg.inv(self.matrix)
+
+    def arc_weight(self, u, v):
+        if u == 0:
+            return self.root[v]
+        return -self.matrix[u - 1, v - 1]
+
+    # Routine to change the weight of the arc u -> v (with u = 0 for the root
+    # arc into v) to weight
+
+    def set_arc_weight(self, u, v, weight):
+        self.add_arc_weight(u, v, weight - self.arc_weight(u, v))
+
+    # Routine to change the weight of the arc u -> v by delta
+
+    def add_arc_weight(self, u, v, delta):
+
+        if delta == 0:
+            return
+
+        i, j = u - 1, v - 1
+
+        self.matrix[j, j] += delta
+        if u == 0:
+            self.root[v] += delta
+        else:
+            self.matrix[i, j] -= delta
+
+        self.updates += 1
+
+        if self.inverse is None or self.updates >= self.refactor_every:
+            self.refactor()
+            return
+
+        # A^-1 x and y^T A^-1 for x = delta (e_v - e_u) (or delta e_v for a
+        # root arc) and y = e_v
+
+        ax = delta * self.inverse[:, j]
+        if u != 0:
+            ax -= delta * self.inverse[:, i]
+        ya = self.inverse[j, :]
+
+        factor = 1 + ax[j]
+
+        # A factor near zero means the update nearly cancels the determinant,
+        # and the updated inverse would lose most of its accuracy
+
+        if np.abs(factor) < self.tol:
+            self.refactor()
+            return
+
+        self.sign *= np.sign(factor)
+        self.log += np.log(np.abs(factor))
+        self.inverse -= np.outer(ax, ya / factor)
+
+    def slogdet(self):
+        return self.sign, self.log
+
+    def determinant(self):
+        return self.sign * np.exp(self.log)
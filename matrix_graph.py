@@ -20,52 +20,280 @@
 #
 # //////////////////////////////////////////////////////////////////////////////
 
+import os
+import math
+from fractions import Fraction
+from decimal import Decimal, localcontext
 import numpy as np
-import networkx as nx
 
-# Routine to create matrix digraph
+# Array-backed matrix digraph.  Vertex 0 is the root and vertices 1..n are the
+# matrix rows/columns.  The off-diagonal arcs u -> v (weight -a_uv) are held in
+# CSR order (sorted by tail, then head) with a CSC permutation for in-arcs, and
+# the root arc weights (the column sums) are held as a dense vector indexed by
+# vertex, with a zero entry meaning no root arc.  Labels are only built on
+# request, from the vertex ids, except for root arcs given their own labels in
+# root_labels (a dict by vertex), such as arcs merged into a root arc.
 
 
-def create_graph_from_matrix_file(file):
+class MatrixDigraph:
+    def __init__(
+        self, n, tail, head, weight, root, ids=None, root_labels=None
+    ):
 
-    G = nx.DiGraph()
-
-    m = np.genfromtxt(file)
-
-    a_diag = {}
-    for i in range(m.shape[0]):
-        if int(m[i, 0]) != int(m[i, 1]):
-            if m[i, 2] != 0:
-                G.add_edge(
-                    int(m[i, 0]),
-                    int(m[i, 1]),
-                    weight=-m[i, 2],
-                    lweight=np.log(np.abs(m[i, 2])),
-                    sign=-np.sign(m[i, 2]),
-                    label="v{:d}{:d}".format(int(m[i, 0]), int(m[i, 1])),
-                )
-                if int(m[i, 1]) in a_diag:
-                    a_diag[int(m[i, 1])] += m[i, 2]
-                else:
-                    a_diag[int(m[i, 1])] = m[i, 2]
+        tail = np.asarray(tail, dtype=np.int64)
+        head = np.asarray(head, dtype=np.int64)
+        weight = np.asarray(weight, dtype=float)
+
+        order = np.lexsort((head, tail))
+
+        self.n = int(n)
+        self.tail = tail[order]
+        self.head = head[order]
+        self.weight = weight[order]
+        self.root = np.zeros(self.n + 1)
+        self.root[: len(root)] = root
+        self.root[0] = 0
+
+        if ids is None:
+            self.ids = np.arange(self.n + 1)
         else:
-            if int(m[i, 1]) in a_diag:
-                a_diag[int(m[i, 1])] += m[i, 2]
+            self.ids = np.asarray(ids, dtype=np.int64)
+
+        self.root_labels = root_labels or {}
+
+        with np.errstate(divide="ignore"):
+            self.lweight = np.log(np.abs(self.weight))
+            self.root_lweight = np.log(np.abs(self.root))
+        self.sign = np.sign(self.weight)
+        self.root_sign = np.sign(self.root)
+
+        vertices = np.arange(self.n + 2)
+        self.indptr = np.searchsorted(self.tail, vertices)
+        self.in_arcs = np.lexsort((self.tail, self.head))
+        self.in_indptr = np.searchsorted(self.head[self.in_arcs], vertices)
+
+    @classmethod
+    def from_triplets(cls, i, j, a, n=None):
+
+        i = np.asarray(i, dtype=np.int64)
+        j = np.asarray(j, dtype=np.int64)
+        a = np.asarray(a, dtype=float)
+
+        if n is None:
+            n = int(max(i.max(initial=0), j.max(initial=0)))
+
+        root = np.bincount(j, weights=a, minlength=n + 1)
+
+        off = (i != j) & (a != 0)
+
+        return cls(n, i[off], j[off], -a[off], root)
+
+    @classmethod
+    def from_matrix(cls, m):
+        return cls.from_triplets(*_dense_triplets(np.asarray(m)), n=len(m))
+
+    @classmethod
+    def from_graph(cls, g):
+
+        n = max(g.nodes, default=0)
+        tail, head, weight = [], [], []
+        root = np.zeros(n + 1)
+
+        for u, v, w in g.edges(data="weight"):
+            if u == 0:
+                root[v] += w
             else:
-                a_diag[int(m[i, 1])] = m[i, 2]
+                tail.append(u)
+                head.append(v)
+                weight.append(w)
+
+        return cls(n, tail, head, weight, root)
+
+    def number_of_arcs(self):
+        return len(self.weight) + int(np.count_nonzero(self.root))
+
+    def root_vertices(self):
+        return np.flatnonzero(self.root)
+
+    def out_arcs(self, u):
+        return slice(self.indptr[u], self.indptr[u + 1])
+
+    def in_arcs_of(self, v):
+        return self.in_arcs[self.in_indptr[v] : self.in_indptr[v + 1]]
+
+    def arc_index(self, u, v):
+        s = self.out_arcs(u)
+        k = s.start + np.searchsorted(self.head[s], v)
+        if k < s.stop and self.head[k] == v:
+            return k
+        return -1
+
+    def arc_weight(self, u, v):
+        if u == 0:
+            return self.root[v]
+        k = self.arc_index(u, v)
+        if k < 0:
+            return 0
+        return self.weight[k]
+
+    def label(self, u, v):
+        if u == 0 and v in self.root_labels:
+            return self.root_labels[v]
+        if u == 0:
+            u = v
+        return "v{:d}{:d}".format(self.ids[u], self.ids[v])
+
+    def labels(self):
+        return [self.label(u, v) for u, v in zip(self.tail, self.head)]
+
+    def to_matrix(self):
+
+        if self.n < 1:
+            return None
+
+        M = np.zeros((self.n, self.n))
+        M[self.tail - 1, self.head - 1] -= self.weight
+        np.add.at(M, (self.head - 1, self.head - 1), self.weight)
+        M[np.diag_indices(self.n)] += self.root[1:]
 
-    for k in a_diag:
-        if a_diag[k] != 0:
+        return M
+
+    # Routine to return the matrix in scipy CSC form
+
+    def to_sparse_matrix(self):
+
+        from scipy import sparse
+
+        v = np.arange(self.n)
+        diag = (
+            self.root[1:]
+            + np.bincount(
+                self.head, weights=self.weight, minlength=self.n + 1
+            )[1:]
+        )
+
+        return sparse.csc_matrix(
+            (
+                np.concatenate((-self.weight, diag)),
+                (
+                    np.concatenate((self.tail - 1, v)),
+                    np.concatenate((self.head - 1, v)),
+                ),
+            ),
+            shape=(self.n, self.n),
+        )
+
+    def to_graph(self, labels=True):
+
+        import networkx as nx
+
+        G = nx.DiGraph()
+
+        for k in range(len(self.weight)):
+            u, v = int(self.tail[k]), int(self.head[k])
+            G.add_edge(
+                u,
+                v,
+                weight=self.weight[k],
+                lweight=self.lweight[k],
+                sign=self.sign[k],
+            )
+            if labels:
+                G[u][v]["label"] = self.label(u, v)
+
+        for v in self.root_vertices():
+            v = int(v)
             G.add_edge(
                 0,
-                k,
-                weight=a_diag[k],
-                lweight=np.log(np.abs(a_diag[k])),
-                sign=np.sign(a_diag[k]),
-                label="v{:d}{:d}".format(k, k),
+                v,
+                weight=self.root[v],
+                lweight=self.root_lweight[v],
+                sign=self.root_sign[v],
             )
+            if labels:
+                G[0][v]["label"] = self.label(0, v)
+
+        return G
+
+
+# Routine to return a graph in its networkx form
+
+
+def as_digraph(g):
+    if isinstance(g, MatrixDigraph):
+        return g.to_graph()
+    return g
+
+
+# Routine to read the (i, j, a_ij) matrix triplets from a file.  Text files
+# hold one triplet per line.  A .npy file holds either an (nnz, 3) triplet
+# array or a square dense matrix (so a three-element triplet array must be
+# stored as .npz) and is memory-mapped.  A .npz file holds either "row",
+# "col", and "data" arrays (with 1-based indices) or a dense "matrix" array.
+# A .npz ensemble of matrices also holds a "ptr" array, with the triplets of
+# matrix k at ptr[k]:ptr[k + 1], and is read by iter_matrix_triplets.
+
+
+def _dense_triplets(m):
+    i, j = np.nonzero(m)
+    return i + 1, j + 1, np.asarray(m[i, j])
+
+
+def load_matrix_triplets(file):
+
+    ext = os.path.splitext(file)[1]
+
+    if ext == ".npy":
+        m = np.load(file, mmap_mode="r")
+        if m.shape[0] == m.shape[1]:
+            return _dense_triplets(m)
+        return m[:, 0], m[:, 1], m[:, 2]
+
+    if ext == ".npz":
+        with np.load(file) as z:
+            if "matrix" in z:
+                return _dense_triplets(z["matrix"])
+            if "ptr" in z and len(z["ptr"]) > 2:
+                raise ValueError(
+                    f"{file} holds an ensemble of matrices; "
+                    "read it with iter_matrix_triplets."
+                )
+            return z["row"], z["col"], z["data"]
+
+    m = np.loadtxt(file, ndmin=2, usecols=(0, 1, 2))
+
+    return m[:, 0], m[:, 1], m[:, 2]
+
 
-    return G
+def iter_matrix_triplets(file):
+
+    if os.path.splitext(file)[1] == ".npz":
+        with np.load(file) as z:
+            if "ptr" in z:
+                ptr = z["ptr"]
+                row, col, data = z["row"], z["col"], z["data"]
+                for k in range(len(ptr) - 1):
+                    s = slice(ptr[k], ptr[k + 1])
+                    yield row[s], col[s], data[s]
+                return
+
+    yield load_matrix_triplets(file)
+
+
+# Routine to create the array form of the matrix digraph
+
+
+def create_matrix_digraph_from_file(file):
+
+    return MatrixDigraph.from_triplets(*load_matrix_triplets(file))
+
+
+# Routine to create matrix digraph
+
+
+def create_graph_from_matrix_file(file):
+
+    return create_matrix_digraph_from_file(file).to_graph()
 
 
 # Routine to return a matrix from a graph
@@ -73,6 +301,9 @@ def create_graph_from_matrix_file(file):
 
 def create_matrix_from_graph(g):
 
+    if isinstance(g, MatrixDigraph):
+        return g.to_matrix()
+
     N = g.number_of_nodes() - 1
 
     if N < 1:
@@ -95,21 +326,16 @@ def create_matrix_from_graph(g):
 
 def compute_LU_determinant(file):
 
-    m = np.genfromtxt(file)
+    i, j, a = load_matrix_triplets(file)
 
-    N = max(
-        np.hstack(
-            (
-                np.asarray(m[:, 0], dtype="int"),
-                np.asarray(m[:, 1], dtype="int"),
-            )
-        )
-    )
+    i = np.asarray(i, dtype=np.int64)
+    j = np.asarray(j, dtype=np.int64)
+
+    N = max(i.max(), j.max())
 
     mat = np.zeros((N, N))
 
-    for k in range(m.shape[0]):
-        mat[int(m[k, 0]) - 1][int(m[k, 1]) - 1] = m[k, 2]
+    mat[i - 1, j - 1] = a
 
     return np.linalg.det(mat)
 
@@ -117,3 +343,153 @@ def compute_LU_determinant(file):
 def compute_LU_determinant_from_graph(g):
 
     return np.linalg.det(create_matrix_from_graph(g))
+
+
+# Routine to compute the sign and the log of the absolute value of the matrix
+# determinant, like numpy.linalg.slogdet.  For more than dense_max rows and a
+# fill (the fraction nnz / n**2 of nonzero matrix elements) of at most
+# dense_fill, the matrix is built in sparse form straight from the arcs and
+# factored by the scipy sparse LU with the COLAMD fill-reducing column
+# ordering, if scipy is available.  Otherwise the dense LU is used, since the
+# sparse factors of a random digraph fill in almost completely once there are
+# more than a few arcs per vertex.  A singular matrix gives (0, -inf).
+
+
+def _permutation_sign(p):
+    seen = np.zeros(len(p), bool)
+    cycles = 0
+    for i in range(len(p)):
+        if not seen[i]:
+            cycles += 1
+            while not seen[i]:
+                seen[i] = True
+                i = p[i]
+    return -1.0 if (len(p) - cycles) % 2 else 1.0
+
+
+def compute_LU_slogdet_from_graph(g, dense_max=500, dense_fill=1.0e-3):
+
+    if not isinstance(g, MatrixDigraph):
+        g = MatrixDigraph.from_graph(g)
+
+    if g.n < 1:
+        return 1.0, 0.0
+
+    try:
+        from scipy.sparse.linalg import splu
+    except ImportError:
+        splu = None
+
+    nnz = len(g.tail) + g.n
+
+    if splu is None or g.n <= dense_max or nnz > dense_fill * g.n**2:
+        sign, log = np.linalg.slogdet(g.to_matrix())
+        return float(sign), float(log)
+
+    try:
+        lu = splu(g.to_sparse_matrix(), permc_spec="COLAMD")
+    except RuntimeError:
+        return 0.0, -np.inf
+
+    u = lu.U.diagonal()
+    if np.any(u == 0):
+        return 0.0, -np.inf
+
+    sign = (
+        _permutation_sign(lu.perm_r)
+        * _permutation_sign(lu.perm_c)
+        * np.prod(np.sign(u))
+    )
+
+    return float(sign), float(np.sum(np.log(np.abs(u))))
+
+
+# Accumulator for a sum of signed terms given as the log of their absolute
+# values and their signs.  Terms are buffered and added in chunks with the
+# log-sum-exp shift, so the sum neither overflows nor underflows.
+
+
+class LogSum:
+    def __init__(self, chunk=4096):
+        self.chunk = chunk
+        self.sign = 0.0
+        self.log = -np.inf
+        self.lweights = []
+        self.signs = []
+
+    def add(self, lweight, sign):
+        self.lweights.append(lweight)
+        self.signs.append(sign)
+        if len(self.lweights) >= self.chunk:
+            self.flush()
+
+    def flush(self):
+
+        if not self.lweights:
+            return
+
+        lw = np.array(self.lweights + [self.log])
+        sg = np.array(self.signs + [self.sign])
+        self.lweights, self.signs = [], []
+
+        m = np.max(lw)
+        if m == -np.inf:
+            return
+
+        x = np.sum(sg * np.exp(lw - m))
+
+        if x == 0:
+            self.sign, self.log = 0.0, -np.inf
+        else:
+            self.sign, self.log = np.sign(x), m + np.log(np.abs(x))
+
+    def slog(self):
+        self.flush()
+        return self.sign, self.log
+
+    def value(self):
+        sign, log = self.slog()
+        return sign * np.exp(log)
+
+
+# Accumulator for the exact sum of products of arc weights
+
+
+class ExactSum:
+    def __init__(self):
+        self.total = Fraction(0)
+
+    def add_product(self, weights):
+        p = Fraction(1)
+        for w in weights:
+            p *= Fraction(float(w))
+        self.total += p
+
+    def value(self):
+        return self.total
+
+
+# Routine to format a number given by its sign and the log of its absolute
+# value, using scientific notation if it is out of the floating-point range
+
+
+def format_slog(sign, log, prec):
+    if sign == 0:
+        return "{:.{prec}f}".format(0, prec=prec)
+    if log < 700:
+        return "{:.{prec}f}".format(sign * np.exp(log), prec=prec)
+    exponent = math.floor(log / math.log(10))
+    mantissa = 10 ** (log / math.log(10) - exponent)
+    return "{:s}{:.{prec}f}e+{:d}".format(
+        "-" if sign < 0 else "", mantissa, exponent, prec=prec
+    )
+
+
+# Routine to format a fraction in fixed-point notation
+
+
+def format_fraction(f, prec):
+    with localcontext() as ctx:
+        ctx.prec = len(str(f.numerator)) + prec + 10
+        d = Decimal(f.numerator) / Decimal(f.denominator)
+    return "{:.{prec}f}".format(d, prec=prec)
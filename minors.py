@@ -0,0 +1,183 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code computes minors of the matrix of a matrix digraph from a single
+# inversion.  A minor is given by the rows I and the columns J (1-based, as the
+# digraph vertices) deleted from the matrix.  By Jacobi's identity, the minor
+# is
+#
+#   det(A with rows I and columns J deleted)
+#       = (-1)^(sum(I) + sum(J)) det(A) det(A^-1[J, I])
+#
+# so a minor with k deleted rows takes only a k x k determinant, and minors
+# with the same k are computed together as a stack.  The cofactors are the
+# case k = 1, which gives them all at once as det(A) A^-T.  For a singular or
+# ill-conditioned matrix, the minors are computed directly from the reduced
+# matrices instead.
+
+from itertools import combinations
+import numpy as np
+import matrix_graph as mg
+
+
+def _matrix(g):
+    if not isinstance(g, mg.MatrixDigraph):
+        g = mg.MatrixDigraph.from_graph(g)
+    return g.to_matrix()
+
+
+# Routine to return the slogdet and inverse of a matrix, with no inverse if
+# the matrix is singular or so ill-conditioned that Jacobi's identity would
+# lose most of the digits of the minors
+
+
+def _inverse(A):
+
+    sign, logdet = np.linalg.slogdet(A)
+
+    if sign == 0:
+        return sign, logdet, None
+
+    inverse = np.linalg.inv(A)
+    cond = np.linalg.norm(A, 1) * np.linalg.norm(inverse, 1)
+    if not cond < 1e8:
+        return sign, logdet, None
+
+    return sign, logdet, inverse
+
+
+def _result(sign, log, as_log):
+    if as_log:
+        return sign, log
+    return sign * np.exp(log)
+
+
+# Routine to compute the matrix of all the cofactors C_ij, with C_ij the
+# signed minor with row i and column j deleted
+
+
+def cofactors(g, log=False):
+
+    A = _matrix(g)
+    n = A.shape[0]
+
+    sign, logdet, inverse = _inverse(A)
+
+    if inverse is not None:
+        C = inverse.T
+        with np.errstate(divide="ignore"):
+            return _result(sign * np.sign(C), logdet + np.log(np.abs(C)), log)
+
+    i, j = np.indices((n, n))
+    s, l = minors(
+        A,
+        np.column_stack((i.ravel() + 1, j.ravel() + 1)).reshape(-1, 2, 1),
+        log=True,
+    )
+    s = s.reshape(n, n) * (-1.0) ** (i + j)
+
+    return _result(s, l.reshape(n, n), log)
+
+
+# Routine to compute the minors with the given rows and columns deleted.
+# deleted is a sequence of (I, J) pairs of equal-length sequences of 1-based
+# row and column indices, or an array of shape (m, 2, k).  g is a matrix
+# digraph, in its array or networkx form, or a square matrix.  Returns an
+# array of the m minors or, if log is True, a (sign, log of the absolute
+# value) pair of arrays.
+
+
+def minors(g, deleted, log=False):
+
+    A = g if isinstance(g, np.ndarray) else _matrix(g)
+    n = A.shape[0]
+
+    deleted = list(deleted)
+    m = len(deleted)
+
+    sign = np.zeros(m)
+    logdet = np.full(m, -np.inf)
+
+    if m == 0:
+        return _result(sign, logdet, log)
+
+    det_sign, det_log, inverse = _inverse(A)
+
+    # Group the minors by the number of deleted rows
+
+    groups = {}
+    for t, (I, J) in enumerate(deleted):
+        if len(I) != len(J):
+            raise ValueError(
+                "Equal numbers of rows and columns must be deleted."
+            )
+        groups.setdefault(len(I), []).append(t)
+
+    for k, index in groups.items():
+        if k == 0:
+            sign[index], logdet[index] = det_sign, det_log
+            continue
+
+        I = np.array([deleted[t][0] for t in index], dtype=int) - 1
+        J = np.array([deleted[t][1] for t in index], dtype=int) - 1
+
+        if k == n:
+            sign[index], logdet[index] = 1.0, 0.0
+            continue
+
+        if inverse is not None:
+            blocks = inverse[J[:, :, None], I[:, None, :]]
+            s, l = np.linalg.slogdet(blocks)
+            parity = (-1.0) ** (I.sum(axis=1) + J.sum(axis=1))
+            sign[index] = det_sign * parity * s
+            logdet[index] = det_log + l
+        else:
+            keep = np.ones((len(index), n), bool)
+            rows = keep.copy()
+            rows[np.arange(len(index))[:, None], I] = False
+            keep[np.arange(len(index))[:, None], J] = False
+            r = np.nonzero(rows)[1].reshape(len(index), n - k)
+            c = np.nonzero(keep)[1].reshape(len(index), n - k)
+            blocks = A[r[:, :, None], c[:, None, :]]
+            sign[index], logdet[index] = np.linalg.slogdet(blocks)
+
+    return _result(sign, logdet, log)
+
+
+# Routine to compute the principal minors with the given sets of rows (and
+# the same columns) deleted
+
+
+def principal_minors(g, deleted, log=False):
+    return minors(g, [(I, I) for I in deleted], log=log)
+
+
+# Routine to compute all the principal minors with k rows and columns
+# deleted.  Returns the deleted sets, in lexicographic order, and the minors.
+
+
+def all_principal_minors(g, k, log=False):
+
+    A = _matrix(g)
+    sets = list(combinations(range(1, A.shape[0] + 1), k))
+
+    return sets, principal_minors(A, sets, log=log)
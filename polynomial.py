@@ -0,0 +1,310 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code holds label determinants in the arc labels.  Each label is
+# interned as an integer variable id, and an arc weight (a label such as
+# "v13+v23") is interned as a sum id, which stands for the sum of its variable
+# ids.  A ProductSum keeps the determinant as it is found, a sum of products
+# of arc weights (one per fully isolated graph), each product a tuple of sum
+# ids, and a TermWriter writes the products out as they are found instead.
+# The expansion of a ProductSum is a Polynomial, in which a monomial is the
+# sorted tuple of the ids of its variables, with a variable repeated once per
+# power, and which maps monomials to integer coefficients.
+
+from itertools import product
+import numpy as np
+
+
+class Variables:
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.sums = {}
+        self.labels = []
+        self.label_ids = {}
+
+    def intern(self, name):
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        return self.ids[name]
+
+    def parse(self, label):
+        if label not in self.sums:
+            self.sums[label] = [self.intern(s) for s in label.split("+")]
+        return self.sums[label]
+
+    def intern_label(self, label):
+        if label not in self.label_ids:
+            self.parse(label)
+            self.label_ids[label] = len(self.labels)
+            self.labels.append(label)
+        return self.label_ids[label]
+
+
+# Class for a sum of products of arc weights, printed in the form
+# "(v11)(v22+v12)+(v12)(v21)"
+
+
+class ProductSum:
+    def __init__(self, variables=None):
+        if variables is None:
+            variables = Variables()
+        self.variables = variables
+        self.terms = []
+
+    def __len__(self):
+        return len(self.terms)
+
+    def number_of_terms(self):
+        return len(self.terms)
+
+    def add_product(self, labels):
+        self.terms.append(
+            tuple(self.variables.intern_label(l) for l in labels)
+        )
+
+    # Routine to add a term in the string form, such as "(v11)(v22+v12)"
+
+    def add_term(self, term):
+        self.add_product(term[1:-1].split(")("))
+
+    def _remap(self, other):
+        if other.variables is self.variables:
+            return other.terms
+        ids = [self.variables.intern_label(l) for l in other.variables.labels]
+        return [tuple(ids[k] for k in t) for t in other.terms]
+
+    def __iadd__(self, other):
+        self.terms += self._remap(other)
+        return self
+
+    def __add__(self, other):
+        result = self.copy()
+        result += other
+        return result
+
+    def __mul__(self, other):
+        result = ProductSum(self.variables)
+        other_terms = self._remap(other)
+        result.terms = [t1 + t2 for t1 in self.terms for t2 in other_terms]
+        return result
+
+    def copy(self):
+        result = ProductSum(self.variables)
+        result.terms = list(self.terms)
+        return result
+
+    # Routine to return the polynomial of the expanded products, with like
+    # terms collected
+
+    def expand(self):
+        poly = Polynomial(self.variables)
+        labels = self.variables.labels
+        for t in self.terms:
+            poly.add_product([labels[k] for k in t])
+        return poly
+
+    def to_string(self):
+        labels = self.variables.labels
+        return "+".join(
+            "".join("(" + labels[k] + ")" for k in t) for t in self.terms
+        )
+
+    def __str__(self):
+        return self.to_string()
+
+    # Routine to evaluate the sum of products at one or more points, without
+    # expanding it.  values is as for Polynomial.evaluate.
+
+    def evaluate(self, values):
+
+        if isinstance(values, dict):
+            values = np.array([values[name] for name in self.variables.names])
+
+        values = np.asarray(values, dtype=float)
+
+        if len(self.terms) == 0:
+            return np.zeros(values.shape[:-1])
+
+        sums = [self.variables.sums[l] for l in self.variables.labels]
+        starts = np.cumsum([0] + [len(s) for s in sums[:-1]])
+        ids = np.fromiter((k for s in sums for k in s), dtype=np.int64)
+        weights = np.add.reduceat(values[..., ids], starts, axis=-1)
+
+        lengths = np.array([len(t) for t in self.terms])
+        factors = np.fromiter(
+            (k for t in self.terms for k in t),
+            dtype=np.int64,
+            count=lengths.sum(),
+        )
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        p = np.ones(values.shape[:-1] + (len(self.terms),))
+        nonzero = lengths > 0
+        if nonzero.any():
+            p[..., nonzero] = np.multiply.reduceat(
+                weights[..., factors], starts[nonzero], axis=-1
+            )
+
+        return p.sum(axis=-1)
+
+
+# Class that writes a sum of products of arc weights to a stream as the
+# products are added, in the form of ProductSum.to_string(), so that the
+# products are not kept
+
+
+class TermWriter:
+    def __init__(self, out, n=0):
+        self.out = out
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def number_of_terms(self):
+        return self.n
+
+    def add_product(self, labels):
+        self.add_term("".join("(" + label + ")" for label in labels))
+
+    # Routine to add a term in the string form, such as "(v11)(v22+v12)"
+
+    def add_term(self, term):
+        if self.n > 0:
+            self.out.write("+")
+        self.out.write(term)
+        self.n += 1
+
+
+class Polynomial:
+    def __init__(self, variables=None):
+        if variables is None:
+            variables = Variables()
+        self.variables = variables
+        self.terms = {}
+
+    def __len__(self):
+        return len(self.terms)
+
+    def number_of_terms(self):
+        return len(self.terms)
+
+    def add_monomial(self, monomial, coefficient=1):
+        c = self.terms.get(monomial, 0) + coefficient
+        if c:
+            self.terms[monomial] = c
+        else:
+            self.terms.pop(monomial, None)
+
+    # Routine to add the expanded product of the given arc labels
+
+    def add_product(self, labels, coefficient=1):
+        factors = [self.variables.parse(label) for label in labels]
+        for ids in product(*factors):
+            self.add_monomial(tuple(sorted(ids)), coefficient)
+
+    # Routine to add a term in the string form, such as "(v11)(v22+v12)"
+
+    def add_term(self, term):
+        self.add_product(term[1:-1].split(")("))
+
+    def _remap(self, other):
+        if other.variables is self.variables:
+            return other.terms.items()
+        ids = [self.variables.intern(name) for name in other.variables.names]
+        return (
+            (tuple(sorted(ids[k] for k in m)), c)
+            for m, c in other.terms.items()
+        )
+
+    def __iadd__(self, other):
+        for m, c in list(self._remap(other)):
+            self.add_monomial(m, c)
+        return self
+
+    def __add__(self, other):
+        result = self.copy()
+        result += other
+        return result
+
+    def __mul__(self, other):
+        result = Polynomial(self.variables)
+        other_terms = list(self._remap(other))
+        for m1, c1 in self.terms.items():
+            for m2, c2 in other_terms:
+                result.add_monomial(tuple(sorted(m1 + m2)), c1 * c2)
+        return result
+
+    def copy(self):
+        result = Polynomial(self.variables)
+        result.terms = dict(self.terms)
+        return result
+
+    def to_string(self):
+        names = self.variables.names
+        v_s = []
+        for m, c in self.terms.items():
+            s = "".join("(" + names[k] + ")" for k in m)
+            if c != 1:
+                s = "{:d}".format(c) + s
+            v_s.append(s)
+        return "+".join(v_s).replace("+-", "-")
+
+    def __str__(self):
+        return self.to_string()
+
+    # Routine to evaluate the polynomial at one or more points.  values is
+    # either a dict of variable values by name or an array whose last axis
+    # holds the values of the variables in id order.
+
+    def evaluate(self, values):
+
+        if isinstance(values, dict):
+            values = np.array([values[name] for name in self.variables.names])
+
+        values = np.asarray(values, dtype=float)
+
+        if len(self.terms) == 0:
+            return np.zeros(values.shape[:-1])
+
+        monomials = list(self.terms)
+        lengths = np.array([len(m) for m in monomials])
+        ids = np.fromiter(
+            (k for m in monomials for k in m),
+            dtype=np.int64,
+            count=lengths.sum(),
+        )
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        coefficients = np.array(
+            [self.terms[m] for m in monomials], dtype=float
+        )
+
+        p = np.ones(values.shape[:-1] + (len(monomials),))
+        nonzero = lengths > 0
+        if nonzero.any():
+            p[..., nonzero] = np.multiply.reduceat(
+                values[..., ids], starts[nonzero], axis=-1
+            )
+
+        return p @ coefficients
@@ -0,0 +1,200 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code renders figures of graphs on the vertices of a matrix digraph,
+# such as its arborescences or fully isolated graphs.  The dot layout of the
+# whole digraph is computed once, and each figure is drawn by neato -n2 with
+# the vertices pinned at those positions, so only the arcs are routed.  The
+# figures are drawn on a pool of worker processes as they are produced, with
+# a bounded number of them in flight, and written either to one file each or,
+# in order, to a single multi-page PDF (with pypdf) or HTML page of SVGs.
+#
+# A figure is a dict with "edges", a list of (u, v, attributes) triples,
+# "graph", a dict of graph attributes, and "file", the output file.
+#
+# networkx is only imported by layout, so that importing this code does not
+# import it.
+
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Routine to return the dot positions of the vertices of a graph, by vertex
+# name
+
+
+def layout(G):
+
+    import networkx as nx
+
+    A = nx.nx_agraph.to_agraph(G)
+    A.layout(prog="dot")
+    return {n: A.get_node(n).attr["pos"] for n in A.nodes()}
+
+
+# Routine to return the figure of a graph with its arc attributes, such as
+# labels or colors, given by attr_func(u, v, d)
+
+
+def figure(G, file, attr_func, graph_attr=None):
+    return {
+        "edges": [
+            (u, v, attr_func(u, v, d)) for u, v, d in G.edges(data=True)
+        ],
+        "graph": graph_attr or {},
+        "file": file,
+    }
+
+
+def _draw(task):
+
+    import pygraphviz as pgv
+
+    pos, fig, fmt, to_bytes = task
+
+    A = pgv.AGraph(directed=True, strict=True)
+    A.edge_attr["color"] = "black"
+
+    for n, p in pos.items():
+        A.add_node(n, pos=p + "!")
+    for u, v, attr in fig["edges"]:
+        A.add_edge(str(u), str(v), **attr)
+    A.graph_attr.update(fig["graph"])
+
+    if to_bytes:
+        return A.draw(format=fmt, prog="neato", args="-n2")
+
+    A.draw(fig["file"], format=fmt, prog="neato", args="-n2")
+    return None
+
+
+class _PdfFile:
+    def __init__(self, file):
+        from pypdf import PdfWriter
+
+        self.file = file
+        self.writer = PdfWriter()
+
+    def write(self, page):
+        from pypdf import PdfReader
+
+        self.writer.append(PdfReader(io.BytesIO(page)))
+
+    def close(self):
+        with open(self.file, "wb") as f:
+            self.writer.write(f)
+
+
+class _HtmlFile:
+    def __init__(self, file):
+        self.f = open(file, "w")
+        self.f.write("<!DOCTYPE html>\n<html>\n<body>\n")
+
+    def write(self, page):
+        svg = page.decode()
+        self.f.write(svg[svg.find("<svg") :])
+        self.f.write("\n")
+
+    def close(self):
+        self.f.write("</body>\n</html>\n")
+        self.f.close()
+
+
+# Class that renders figures, with the vertices at positions pos, in the
+# given format ("pdf" or "svg") on a pool of workers.  Each figure is sent to
+# the pool when it is added, and, once more than window figures are in
+# flight, the oldest is waited for, so that the figures are not all held in
+# memory.  If single_file is set, the figures are written, as they are
+# drawn, as the pages of one PDF file (for pdf) or as one HTML file (for svg)
+# instead of to their own files.  pypdf still holds the PDF pages until the
+# file is closed.
+
+
+class Renderer:
+    def __init__(
+        self, pos, fmt="pdf", workers=None, single_file=None, window=None
+    ):
+
+        if single_file and fmt == "pdf":
+            try:
+                import pypdf  # noqa: F401
+            except ImportError:
+                raise ImportError(
+                    "A single PDF file requires the pypdf package."
+                )
+
+        self.pos = pos
+        self.fmt = fmt
+        self.window = window or 4 * (workers or os.cpu_count() or 1)
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.futures = deque()
+        self.out = None
+        if single_file:
+            if fmt == "pdf":
+                self.out = _PdfFile(single_file)
+            else:
+                self.out = _HtmlFile(single_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(abort=exc_type is not None)
+
+    def _collect(self):
+        page = self.futures.popleft().result()
+        if self.out:
+            self.out.write(page)
+
+    def add(self, fig):
+        self.futures.append(
+            self.executor.submit(
+                _draw, (self.pos, fig, self.fmt, self.out is not None)
+            )
+        )
+        while len(self.futures) > self.window:
+            self._collect()
+
+    # Routine to wait for the remaining figures and close the single file.
+    # With abort, the remaining figures are dropped instead.
+
+    def close(self, abort=False):
+        if self.executor is None:
+            return
+        try:
+            while self.futures and not abort:
+                self._collect()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+            if self.out:
+                self.out.close()
+
+
+# Routine to render an iterable of figures (see Renderer)
+
+
+def render(figures, pos, fmt="pdf", workers=None, single_file=None):
+    with Renderer(pos, fmt, workers, single_file) as renderer:
+        for fig in figures:
+            renderer.add(fig)
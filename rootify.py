@@ -22,9 +22,11 @@
 
 # This code uses a depth-first search approach to isolating all vertices.
 
-import networkx as nx
 import copy
-from itertools import combinations
+import operator
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import matrix_graph as mg
 
 
 def default_add_func(G, root, u, v):
@@ -34,109 +36,856 @@ def default_add_func(G, root, u, v):
         G.add_edge(root, v, weight=G[u][v]["weight"])
 
 
-def sequential(G, add_func=None, process_func=None):
+def label_add_func(G, root, u, v):
+    if G.has_edge(root, v):
+        G.get_edge_data(root, v)["label"] += "+" + G[u][v]["label"]
+    else:
+        G.add_edge(root, v, label=G[u][v]["label"])
 
-    #   Find the root
 
-    root = [node for node in G.nodes if G.in_degree(node) == 0]
+# The isolation works in place on a single copy of the input graph.  Before an
+# adjacency dict or arc attribute dict is changed in a step, a shallow copy of
+# it is saved in an undo log, and the step is rolled back by restoring the
+# saved dicts in reverse order.  Restoring whole dicts keeps the edge order,
+# and thus the order of the callbacks, the same as for a fresh copy.  The
+# graphs yielded by the iter_* generators are the working graph, which is only
+# valid until the generator is resumed, while sequential() and partitioned()
+# pass process_func a copy that the caller may keep.
+
+
+class _UndoLog:
+    def __init__(self):
+        self.saved = []
+        self.seen = set()
+
+    def mark(self):
+        self.seen = set()
+        return len(self.saved)
+
+    def save(self, d):
+        if id(d) not in self.seen:
+            self.seen.add(id(d))
+            self.saved.append((d, dict(d)))
+
+    def rollback(self, mark):
+        while len(self.saved) > mark:
+            d, saved = self.saved.pop()
+            d.clear()
+            d.update(saved)
+        self.seen = set()
+
+
+def _remove_edge(G, log, u, v):
+    log.save(G._succ[u])
+    log.save(G._pred[v])
+    G.remove_edge(u, v)
 
+
+def _merge_edge(G, log, root, u, v, add_func):
+    log.save(G._succ[root])
+    log.save(G._pred[v])
+    if G.has_edge(root, v):
+        log.save(G[root][v])
+    if add_func:
+        add_func(G, root, u, v)
+    else:
+        default_add_func(G, root, u, v)
+    _remove_edge(G, log, u, v)
+
+
+def _find_root(G):
+    root = [node for node in G.nodes if G.in_degree(node) == 0]
     if len(root) != 1:
-        return
+        return None
+    return root[0]
 
-    #   Find non-isolated nodes
 
-    v_r = [v for u, v in G.out_edges(root[0]) if G.out_degree[v] > 0]
+def _isolate(G, root, log, w, add_func):
+    for u in [u for u in G._pred[w] if u != root]:
+        _remove_edge(G, log, u, w)
+    for v in list(G._succ[w]):
+        _merge_edge(G, log, root, w, v, add_func)
 
-    #   Process if no non-isolated nodes
 
-    if len(v_r) == 0:
+def _non_isolated(G, root):
+    return [v for v in G._succ[root] if G.out_degree[v] > 0]
+
+
+# Generator that applies the isolation step for each child of the current
+# node in turn, yielding while the child graph is in place.
+
+
+def _sequential_steps(G, root, log, add_func, v_r):
+
+    #   Root each node, removing the root arcs of already processed nodes
+
+    start = log.mark()
+    for r in v_r:
+        step = log.mark()
+        _isolate(G, root, log, r, add_func)
+        yield
+        log.rollback(step)
+        log.mark()
+        _remove_edge(G, log, root, r)
+    log.rollback(start)
+
+
+def sequential(G, add_func=None, process_func=None, depth=-1):
+    for g in iter_sequential(G, add_func=add_func, depth=depth):
         if process_func:
-            process_func(G)
-        return
+            process_func(g.copy())
 
-    #   Otherwise recurse
 
-    else:
-        processed_root_edges = []
-        for r in v_r:
-            G_c = copy.deepcopy(G)
-            for e in processed_root_edges:
-                G_c.remove_edge(*e)
-            for e in [(u, v) for u, v in G.in_edges(r) if u != root[0]]:
-                G_c.remove_edge(*e)
-            for u, v in G.out_edges(r):
-                if add_func:
-                    add_func(G_c, root[0], u, v)
-                else:
-                    default_add_func(G_c, root[0], u, v)
-                G_c.remove_edge(u, v)
-
-            sequential(G_c, add_func=add_func, process_func=process_func)
-            processed_root_edges.append((root[0], r))
+# Generator of the partitions of a set into two non-empty blocks.  Each
+# partition is yielded once, as a pair whose first block holds the smallest
+# element; the rest of that block is given by the bits of a mask over the
+# remaining elements.
 
 
 def get_partitions(original_set):
     assert len(original_set) >= 2, "Set cannot be partitioned."
 
-    partitions = []
-    for i in range(1, len(original_set) // 2 + 1):
-        for subset1_tuple in combinations(original_set, i):
-            subset1 = set(subset1_tuple)
-            subset2 = original_set - subset1
+    elements = sorted(original_set)
+    first = elements[0]
+    bits = {1 << k: w for k, w in enumerate(elements[1:])}
+
+    for mask in range((1 << len(bits)) - 1):
+        subset1 = {first}
+        while mask:
+            low = mask & -mask
+            subset1.add(bits[low])
+            mask ^= low
+        yield subset1, original_set - subset1
+
+
+def _partitioned_steps(G, root, log, add_func, v_r):
+
+    s_r = set(v_r)
+    s_r.add(root)
+    for p in get_partitions(s_r):
+        step = log.mark()
+        s_rooted = p[0]
+        s_not_rooted = p[1]
+        if root not in p[1]:
+            s_not_rooted = p[0]
+            s_rooted = p[1]
+        for w in s_not_rooted:
+            if w != root:
+                _remove_edge(G, log, root, w)
+        for w in s_rooted:
+            for u in [u for u in G._pred[w] if u != root]:
+                _remove_edge(G, log, u, w)
+        for w in s_rooted:
+            for v in list(G._succ[w]):
+                _merge_edge(G, log, root, w, v, add_func)
+        yield
+        log.rollback(step)
+
+
+# Generator of the fully isolated graphs (or of the graphs at the given depth
+# of the isolation tree).  Each graph yielded is the working graph, which is
+# only valid until the generator is resumed.
+
+
+def _leaves(G, root, log, add_func, steps, depth=-1):
+
+    #   Stop if a non-root node has no in-edges
+
+    if _find_root(G) is None:
+        return
+
+    #   Find non-isolated nodes
+
+    v_r = _non_isolated(G, root)
+
+    #   Yield if no non-isolated nodes or if at the requested depth
+
+    if len(v_r) == 0 or depth == 0:
+        yield G
+        return
+
+    #   Otherwise recurse
+
+    for _ in steps(G, root, log, add_func, v_r):
+        yield from _leaves(G, root, log, add_func, steps, depth - 1)
 
-            if subset1 and subset2:
-                partition_pair = tuple(
-                    sorted((subset1, subset2), key=lambda x: sorted(list(x)))
-                )
-                if partition_pair not in partitions:
-                    partitions.append(partition_pair)
-    return partitions
 
+def _iter_leaves(G, add_func, steps, depth):
 
-def partitioned(G, add_func=None, process_func=None):
+    G = copy.deepcopy(mg.as_digraph(G))
 
     #   Find the root
 
-    root = [node for node in G.nodes if G.in_degree(node) == 0]
+    root = _find_root(G)
 
-    if len(root) != 1:
+    if root is None:
         return
 
-    #   Find non-isolated nodes
+    yield from _leaves(G, root, _UndoLog(), add_func, steps, depth)
+
+
+def iter_sequential(G, add_func=None, depth=-1):
+    return _iter_leaves(G, add_func, _sequential_steps, depth)
+
 
-    s_r = {v for u, v in G.out_edges(root[0]) if G.out_degree[v] > 0}
+def iter_partitioned(G, add_func=None, depth=-1):
+    return _iter_leaves(G, add_func, _partitioned_steps, depth)
 
-    #   Process if no non-isolated nodes
 
-    if len(s_r) == 0:
+def partitioned(G, add_func=None, process_func=None, depth=-1):
+    for g in iter_partitioned(G, add_func=add_func, depth=depth):
         if process_func:
-            process_func(G)
+            process_func(g.copy())
+
+
+# Generator of the fully isolated graphs that keeps the path of the last graph
+# yielded in state["path"].  Given the state of an earlier isolation of the
+# same graph, it resumes after that graph.  The steps before the path are
+# taken and rolled back without descending, so only the nodes along the path
+# are redone.
+
+
+def iter_resumable(G, rooting="sequential", add_func=None, state=None):
+
+    G = copy.deepcopy(mg.as_digraph(G))
+
+    root = _find_root(G)
+
+    if root is None:
         return
 
-    #   Otherwise recurse
+    steps = {
+        "sequential": _sequential_steps,
+        "partitioned": _partitioned_steps,
+    }[rooting]
+
+    log = _UndoLog()
+
+    if state is None:
+        state = {}
+    replay = state.get("path")
+    path = []
+    state["path"] = path
+
+    def leaves():
+
+        nonlocal replay
+
+        if _find_root(G) is None:
+            return
+
+        v_r = _non_isolated(G, root)
+
+        if len(v_r) == 0:
+            if replay is not None:
+                replay = None
+            else:
+                yield G
+            return
+
+        level = len(path)
+        skip = replay[level] if replay is not None else 0
+        path.append(skip)
+
+        for i, _ in enumerate(steps(G, root, log, add_func, v_r)):
+            if i >= skip:
+                path[level] = i
+                yield from leaves()
+
+        path.pop()
+
+    yield from leaves()
+
+
+# Memoized isolation.  A root arc 0 -> v is settled once v has no out-arcs
+# and no in-arcs other than the root arc; no later isolation step changes it.
+# The sum over the leaves below a node is then the product of the settled arc
+# weights times a function of the remaining (active) arcs alone, so the value
+# for the active arcs is cached under a key built from them.  The key keeps
+# the arc order, since the order in which nodes are rooted fixes which fully
+# isolated graphs are generated.  Label mode caches Expression nodes, which
+# are shared by all the nodes with the same active arcs.  The cache is a
+# bounded LRU cache.
+#
+# The products of an Expression are given in the arc order of the fully
+# isolated graphs, as without memoization.  The root arcs of a leaf are in
+# the order in which they were last added, and the labels of root arcs grow
+# as arcs are merged into them, so an Expression that is shared by nodes
+# with different settled arcs, or with labels that differ in the order of
+# their terms, stores its root arcs relative to its node.  A root arc is
+# given by a (key, text) pair.  The key (0, r) is for the r-th active root
+# arc of the node, whose label there is followed by text, and (1, k) is for
+# the k-th root arc added by the isolation step, whose label is text.  A
+# node holds, for each child, the pairs of the root arcs settled by the step
+# (factors) and of the active root arcs of the child (remap), and the pairs
+# are resolved from the top down as the products are generated, with the
+# keys of added arcs becoming (1, depth, k) so that the arcs added further
+# down come later.  A leaf holds the labels of its arcs that are not from the
+# root, which are never changed, before and after the root arcs.
+
+
+class Expression:
+    def __init__(self, children=None, fixed=None):
+        self.children = children
+        self.fixed = fixed
+
+    # Routine to generate the products of the arc labels, as tuples.  The
+    # tree is walked with an explicit stack, since it can be deep.
+
+    def products(self):
+        factors = []
+        stack = [(iter(self.children), None, 0, 0)]
+        while stack:
+            children, parent, depth, n = stack[-1]
+            del factors[n:]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                continue
+            settled, remap, node = child
+            factors.extend(_resolve(f, parent, depth) for f in settled)
+            remap = [_resolve(f, parent, depth) for f in remap]
+            if node.children is None:
+                before, after = node.fixed
+                yield before + tuple(
+                    t for k, t in sorted(factors + remap)
+                ) + after
+            else:
+                stack.append(
+                    (iter(node.children), remap, depth + 1, len(factors))
+                )
+
+
+def _resolve(factor, parent, depth):
+    key, text = factor
+    if key[0] == 1:
+        return (1, depth, key[1]), text
+    if parent is None:
+        return factor
+    k, t = parent[key[1]]
+    return k, t + text
+
+
+# Routine to return the (remap, factors) pairs of the active and newly
+# settled root arcs of a child node, relative to a node whose active root
+# arcs have the given attribute dicts (by id, for their rank) and labels
+
+
+def _child_arcs(G, root, settled, new, ranks, labels):
+    remap, factors = [], []
+    k = 0
+    for v, d in G._succ[root].items():
+        if v in settled:
+            continue
+        r = ranks.get(id(d))
+        if r is None:
+            f = ((1, k), d["label"])
+            k += 1
+        else:
+            f = ((0, r), d["label"][len(labels[r]) :])
+        (factors if v in new else remap).append(f)
+    return remap, factors
+
+
+# Routine to return the Expression of a fully isolated graph.  Its active
+# root arcs are those of the remap of its parent.
+
+
+def _leaf_expression(G, root):
+    before, after = [], []
+    fixed = before
+    for u, nbrs in G._succ.items():
+        if u == root:
+            fixed = after
+        else:
+            fixed.extend(d["label"] for d in nbrs.values())
+    return Expression(fixed=(tuple(before), tuple(after)))
+
+
+class _LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.data:
+            self.data.move_to_end(key)
+            self.hits += 1
+            return self.data[key]
+        self.misses += 1
+        return None
 
+    def put(self, key, value):
+        self.data[key] = value
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+
+def _numeric_key(d):
+    return d["weight"]
+
+
+def _label_key(d):
+    return "+".join(sorted(d["label"].split("+")))
+
+
+def _settled(G, root):
+    return {
+        v
+        for v in G._succ[root]
+        if G.out_degree[v] == 0 and G.in_degree[v] == 1
+    }
+
+
+def _memoized(G, root, log, add_func, steps, label, cache):
+
+    #   Stop if a non-root node has no in-edges
+
+    if _find_root(G) is None:
+        return None, 0
+
+    settled = _settled(G, root)
+    active = [
+        (u, v, d)
+        for u, v, d in G.edges(data=True)
+        if not (u == root and v in settled)
+    ]
+
+    key_func = _label_key if label else _numeric_key
+    key = tuple((u, v, key_func(d)) for u, v, d in active)
+
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    v_r = _non_isolated(G, root)
+
+    if len(v_r) == 0:
+        if label:
+            value = _leaf_expression(G, root)
+        else:
+            value = 1
+            for u, v, d in active:
+                value *= d["weight"]
+        cache.put(key, (value, 1))
+        return value, 1
+
+    if label:
+        arcs = [d for u, v, d in active if u == root]
+        ranks = {id(d): r for r, d in enumerate(arcs)}
+        labels = [d["label"] for d in arcs]
+
+    value = [] if label else 0
+    count = 0
+    for _ in steps(G, root, log, add_func, v_r):
+        new = _settled(G, root) - settled
+        if label:
+            remap, factors = _child_arcs(G, root, settled, new, ranks, labels)
+        w, c = _memoized(G, root, log, add_func, steps, label, cache)
+        if c == 0:
+            continue
+        if label:
+            value.append((factors, remap, w))
+        else:
+            for v in new:
+                w *= G[root][v]["weight"]
+            value += w
+        count += c
+
+    if label:
+        value = Expression(value)
+
+    cache.put(key, (value, count))
+
+    return value, count
+
+
+# Routine to compute the sum over the fully isolated graphs with memoization.
+# Returns the number of fully isolated graphs and either the numerical sum or
+# an Expression whose products() are the label products.
+
+
+def memoized(
+    G,
+    rooting="sequential",
+    calc_type="numeric",
+    add_func=None,
+    maxsize=1000000,
+):
+
+    G = copy.deepcopy(mg.as_digraph(G))
+
+    root = _find_root(G)
+
+    if root is None:
+        return 0, None
+
+    steps = {
+        "sequential": _sequential_steps,
+        "partitioned": _partitioned_steps,
+    }[rooting]
+
+    label = calc_type == "label"
+
+    value, count = _memoized(
+        G, root, _UndoLog(), add_func, steps, label, _LRUCache(maxsize)
+    )
+
+    if count == 0:
+        return 0, None
+
+    settled = _settled(G, root)
+    if label:
+        remap, factors = [], []
+        for k, (v, d) in enumerate(G._succ[root].items()):
+            (factors if v in settled else remap).append(((0, k), d["label"]))
+        value = Expression([(factors, remap, value)])
+    else:
+        for v in settled:
+            value *= G[root][v]["weight"]
+
+    return count, value
+
+
+# Numeric isolation.  The steps are the same as above, but on plain dicts of
+# arc weights (in the same order as the graph's adjacency dicts, so the same
+# fully isolated graphs are reached) rather than on a DiGraph, and nothing is
+# done per leaf but a multiplication.  A settled root arc (see above) does not
+# change further down the tree, so its weight is multiplied into a partial
+# product passed down the recursion, and the settled vertices are carried as
+# a bitmask.  Each subtree returns its sum and number of leaves.
+
+
+class _Weights:
+    def __init__(self, G):
+        self.succ = {
+            u: {v: d["weight"] for v, d in nbrs.items()}
+            for u, nbrs in G._succ.items()
+        }
+        self.pred = {v: dict.fromkeys(nbrs) for v, nbrs in G._pred.items()}
+
+    def find_root(self):
+        root = [v for v, p in self.pred.items() if not p]
+        if len(root) != 1:
+            return None
+        return root[0]
+
+    def remove(self, log, u, v):
+        log.save(self.succ[u])
+        log.save(self.pred[v])
+        del self.succ[u][v]
+        del self.pred[v][u]
+
+    def merge(self, log, root, u, v):
+        s = self.succ[root]
+        log.save(s)
+        log.save(self.pred[v])
+        if v in s:
+            s[v] += self.succ[u][v]
+        else:
+            s[v] = self.succ[u][v]
+            self.pred[v][root] = None
+        self.remove(log, u, v)
+
+    def isolate(self, log, root, w):
+        for u in [u for u in self.pred[w] if u != root]:
+            self.remove(log, u, w)
+        for v in list(self.succ[w]):
+            self.merge(log, root, w, v)
+
+
+def _weight_sequential_steps(W, root, log, v_r):
+    start = log.mark()
+    for r in v_r:
+        step = log.mark()
+        W.isolate(log, root, r)
+        yield
+        log.rollback(step)
+        log.mark()
+        W.remove(log, root, r)
+    log.rollback(start)
+
+
+def _weight_partitioned_steps(W, root, log, v_r):
+    s_r = set(v_r)
+    s_r.add(root)
+    for p in get_partitions(s_r):
+        step = log.mark()
+        s_rooted = p[0]
+        s_not_rooted = p[1]
+        if root not in p[1]:
+            s_not_rooted = p[0]
+            s_rooted = p[1]
+        for w in s_not_rooted:
+            if w != root:
+                W.remove(log, root, w)
+        for w in s_rooted:
+            for u in [u for u in W.pred[w] if u != root]:
+                W.remove(log, u, w)
+        for w in s_rooted:
+            for v in list(W.succ[w]):
+                W.merge(log, root, w, v)
+        yield
+        log.rollback(step)
+
+
+# Routine to settle the root arcs of a node.  Returns the non-isolated
+# vertices, the settled bitmask, and the partial product, which for a leaf
+# (no non-isolated vertices) is the weight of the fully isolated graph.
+
+
+def _settle(W, root, settled, product):
+
+    succ = W.succ[root]
+
+    v_r = []
+    for v, w in succ.items():
+        if W.succ[v]:
+            v_r.append(v)
+        elif not settled >> v & 1 and len(W.pred[v]) == 1:
+            settled |= 1 << v
+            product *= w
+
+    if len(v_r) == 0:
+
+        #   All root arcs are settled unless arcs remain among vertices that
+        #   are not children of the root
+
+        if len(succ) < len(W.succ) - 1:
+            for v, w in succ.items():
+                if not settled >> v & 1:
+                    product *= w
+            for u, nbrs in W.succ.items():
+                if u != root:
+                    for w in nbrs.values():
+                        product *= w
+
+    return v_r, settled, product
+
+
+def _weight_sum(W, root, log, steps, settled, product):
+
+    if W.find_root() is None:
+        return 0, 0
+
+    v_r, settled, product = _settle(W, root, settled, product)
+
+    if len(v_r) == 0:
+        return product, 1
+
+    total, count = 0, 0
+    for _ in steps(W, root, log, v_r):
+        s, c = _weight_sum(W, root, log, steps, settled, product)
+        total += s
+        count += c
+
+    return total, count
+
+
+# Checkpointing.  The position of a depth-first isolation is its path, the
+# number of the step at each level of the isolation tree, which is kept in
+# state["path"].  For the numerical sum, the path gives the number of steps
+# done at each level, and state["partial"] their (sum, count).  Given the
+# state of an earlier isolation of the same graph, the isolation resumes from
+# it: the steps already done are taken and rolled back without descending, so
+# only the nodes along the path are redone, and the sums are the same as if
+# the isolation had not stopped.  checkpoint(state) is called after each step
+# is done.
+
+
+def _resumable_weight_sum(W, root, steps, state, checkpoint):
+
+    log = _UndoLog()
+    replay = state.get("path"), state.get("partial")
+    if replay[0] is None:
+        replay = None
+    path, partial = [], []
+    state["path"] = path
+    state["partial"] = partial
+
+    def weight_sum(settled, product):
+
+        nonlocal replay
+
+        if W.find_root() is None:
+            return 0, 0
+
+        v_r, settled, product = _settle(W, root, settled, product)
+
+        if len(v_r) == 0:
+            return product, 1
+
+        level = len(path)
+        if replay is not None:
+            skip = replay[0][level]
+            total, count = replay[1][level]
+            if level + 1 == len(replay[0]):
+                replay = None
+        else:
+            skip = 0
+            total, count = 0, 0
+
+        path.append(skip)
+        partial.append((total, count))
+
+        for i, _ in enumerate(steps(W, root, log, v_r)):
+            if i < skip:
+                continue
+            s, c = weight_sum(settled, product)
+            total += s
+            count += c
+            path[level] = i + 1
+            partial[level] = (total, count)
+            if checkpoint:
+                checkpoint(state)
+
+        path.pop()
+        partial.pop()
+
+        return total, count
+
+    return weight_sum(0, 1)
+
+
+# Routine to compute the numerical sum over the fully isolated graphs without
+# building them.  With a state or checkpoint function, the isolation may be
+# checkpointed and resumed (see above).  Returns the number of fully isolated
+# graphs and the sum (None if there are none).
+
+
+def numeric(G, rooting="sequential", state=None, checkpoint=None):
+
+    W = _Weights(mg.as_digraph(G))
+
+    root = W.find_root()
+
+    if root is None:
+        return 0, None
+
+    steps = {
+        "sequential": _weight_sequential_steps,
+        "partitioned": _weight_partitioned_steps,
+    }[rooting]
+
+    if state is None and checkpoint is None:
+        value, count = _weight_sum(W, root, _UndoLog(), steps, 0, 1)
     else:
-        s_r.add(root[0])
-        for p in get_partitions(s_r):
-            G_c = copy.deepcopy(G)
-            s_rooted = p[0]
-            s_not_rooted = p[1]
-            if root[0] not in p[1]:
-                s_not_rooted = p[0]
-                s_rooted = p[1]
-            for w in s_not_rooted:
-                if w != root[0]:
-                    G_c.remove_edge(root[0], w)
-            for w in s_rooted:
-                for e in [(u, v) for u, v in G.in_edges(w) if u != root[0]]:
-                    G_c.remove_edge(*e)
-            for w in s_rooted:
-                for u, v in G.out_edges(w):
-                    if G_c.has_edge(u, v):
-                        if add_func:
-                            add_func(G_c, root[0], u, v)
-                        else:
-                            default_add_func(G_c, root[0], u, v)
-                        G_c.remove_edge(u, v)
-
-            partitioned(G_c, add_func=add_func, process_func=process_func)
+        value, count = _resumable_weight_sum(
+            W, root, steps, {} if state is None else state, checkpoint
+        )
+
+    if count == 0:
+        return 0, None
+
+    return count, value
+
+
+# Leaf functions for parallel().  These must be defined at module level so
+# that they can be sent to the worker processes.
+
+
+def leaf_weight(G):
+    p = 1
+    for u, v, d in G.edges(data=True):
+        p *= d["weight"]
+    return p
+
+
+def leaf_terms(G):
+    return ["".join("(" + d["label"] + ")" for u, v, d in G.edges(data=True))]
+
+
+def leaf_graphs(G):
+    return [G.copy()]
+
+
+class _Reducer:
+    def __init__(self, leaf_func, combine):
+        self.leaf_func = leaf_func
+        self.combine = combine
+        self.count = 0
+        self.value = None
+
+    def __call__(self, G):
+        w = self.leaf_func(G)
+        if self.count == 0:
+            self.value = w
+        else:
+            self.value = self.combine(self.value, w)
+        self.count += 1
+
+
+_ROOTINGS = {"sequential": iter_sequential, "partitioned": iter_partitioned}
+
+
+def _run_subtree(task):
+    G, rooting, add_func, leaf_func, combine = task
+    if leaf_func is None:
+        return numeric(G, rooting)
+    reducer = _Reducer(leaf_func, combine)
+    for g in _ROOTINGS[rooting](G, add_func=add_func):
+        reducer(g)
+    return reducer.count, reducer.value
+
+
+# Generator that runs the isolation on a process pool.  The isolation tree
+# is split at the given depth, the subtrees below it are run in the workers,
+# and the leaf values leaf_func(G) are reduced with combine within each
+# subtree.  With no leaf_func, each subtree is summed by numeric(), which does
+# not build the fully isolated graphs.  Yields the (number of leaves, reduced
+# value) of each subtree in depth-first order, so the order does not depend
+# on the scheduling.
+
+
+def iter_parallel(
+    G,
+    leaf_func=None,
+    combine=operator.add,
+    rooting="sequential",
+    add_func=None,
+    depth=1,
+    workers=None,
+):
+
+    frontier = [
+        copy.deepcopy(g)
+        for g in _ROOTINGS[rooting](G, add_func=add_func, depth=depth)
+    ]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        tasks = [(g, rooting, add_func, leaf_func, combine) for g in frontier]
+        yield from executor.map(_run_subtree, tasks)
+
+
+# Routine to run the isolation on a process pool (see iter_parallel), with
+# the values of the subtrees reduced with combine in depth-first order.
+# Returns the number of leaves and the reduced value (None if there are no
+# leaves).
+
+
+def parallel(
+    G,
+    leaf_func=None,
+    combine=operator.add,
+    rooting="sequential",
+    add_func=None,
+    depth=1,
+    workers=None,
+):
+
+    count, value = 0, None
+
+    for c, w in iter_parallel(
+        G, leaf_func, combine, rooting, add_func, depth, workers
+    ):
+        if c == 0:
+            continue
+        if count == 0:
+            value = w
+        else:
+            value = combine(value, w)
+        count += c
+
+    return count, value
@@ -0,0 +1,203 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code estimates the sum over the arborescence weights of a matrix
+# digraph by Monte Carlo sampling.  Arborescences rooted at vertex 0 are drawn
+# by Wilson's loop-erased random walk, in which the walk from vertex v steps
+# back along an in-arc u -> v with probability proportional to the absolute
+# value of the arc weight.  An arborescence T is thus drawn with probability
+# |w(T)| / Z, where Z is the sum of the absolute arborescence weights, which
+# is the determinant of the matrix with the arc weights replaced by their
+# absolute values.  Z is computed once by LU decomposition, and the weight sum
+# is Z times the mean sign of the sampled arborescences.  If the arc weights
+# do not have mixed signs, every arborescence has the same sign, so the
+# estimate is Z (that is, the LU determinant) with no sampling error.
+
+from statistics import NormalDist
+import numpy as np
+import matrix_graph as mg
+
+
+class ArborescenceSampler:
+    def __init__(self, D, seed=None):
+
+        self.n = D.n
+        self.rng = np.random.default_rng(seed)
+
+        # In-arcs grouped by head, with the root arc first
+
+        roots = D.root_vertices()
+        tail = np.concatenate((np.zeros(len(roots), int), D.tail[D.in_arcs]))
+        head = np.concatenate((roots, D.head[D.in_arcs]))
+        weight = np.concatenate((D.root[roots], D.weight[D.in_arcs]))
+        order = np.argsort(head, kind="stable")
+
+        self.tail = tail[order]
+        self.head = head[order]
+        self.sign = np.sign(weight[order])
+        aweight = np.abs(weight[order])
+
+        # Cumulative step probabilities, offset by v - 1 for head v, so that a
+        # single sorted search over all the arcs picks the step for any vertex
+
+        z = np.bincount(self.head, weights=aweight, minlength=self.n + 1)
+        first = np.searchsorted(self.head, self.head)
+        c = np.cumsum(aweight)
+        self.cumulative = (self.head - 1) + (
+            c - c[first] + aweight[first]
+        ) / z[self.head]
+        last = np.searchsorted(self.head, np.arange(1, self.n + 1), "right")
+        self.cumulative[last[last > 0] - 1] = self.head[last[last > 0] - 1]
+
+        self.spanning = self.n > 0 and self._spans(D)
+
+        # Log of the sum of the absolute arborescence weights, the
+        # determinant of the matrix digraph with the absolute arc weights
+
+        self.log_normalizer = -np.inf
+        if self.spanning:
+            sign, log = mg.compute_LU_slogdet_from_graph(
+                mg.MatrixDigraph(
+                    D.n, D.tail, D.head, np.abs(D.weight), np.abs(D.root)
+                )
+            )
+            if sign > 0:
+                self.log_normalizer = log
+
+    def _spans(self, D):
+        reached = np.zeros(self.n + 1, bool)
+        reached[0] = True
+        frontier = D.root_vertices()
+        while len(frontier):
+            reached[frontier] = True
+            heads = np.concatenate(
+                [D.head[D.out_arcs(u)] for u in frontier] + [[]]
+            ).astype(int)
+            frontier = np.unique(heads[~reached[heads]])
+        return bool(reached.all())
+
+    # Routine to draw a batch of arborescences.  The walks of all the samples
+    # in the batch advance in lockstep, each sample either taking a walk step
+    # or an erasing step (adding a walk vertex to its tree) at each pass.
+    # Returns the parent arrays and the signs of the arborescence weights.
+
+    def sample(self, size):
+
+        n = self.n
+        b = np.arange(size)
+
+        in_tree = np.zeros((size, n + 1), bool)
+        in_tree[:, 0] = True
+        arc = np.zeros((size, n + 1), int)
+        start = np.ones(size, int)
+        current = np.ones(size, int)
+        walking = np.ones(size, bool)
+        active = np.ones(size, bool)
+
+        while active.any():
+
+            idx = b[active & walking]
+            if len(idx):
+                v = current[idx]
+                k = np.searchsorted(
+                    self.cumulative,
+                    v - 1 + self.rng.random(len(idx)),
+                    side="right",
+                )
+                arc[idx, v] = k
+                current[idx] = self.tail[k]
+                hit = idx[in_tree[idx, current[idx]]]
+                walking[hit] = False
+                current[hit] = start[hit]
+
+            idx = b[active & ~walking]
+            if len(idx):
+                u = current[idx]
+                fresh = ~in_tree[idx, u]
+                i, u = idx[fresh], u[fresh]
+                in_tree[i, u] = True
+                current[i] = self.tail[arc[i, u]]
+
+                done = idx[~fresh]
+                nxt = np.argmin(in_tree[done], axis=1)
+                finished = in_tree[done, nxt]
+                active[done[finished]] = False
+                restart = done[~finished]
+                start[restart] = nxt[~finished]
+                current[restart] = nxt[~finished]
+                walking[restart] = True
+
+        arc = arc[:, 1:]
+
+        return (
+            self.tail[arc].astype(np.int32),
+            np.prod(self.sign[arc], axis=1),
+        )
+
+
+# Routine to return whether the arc weights of a matrix digraph have mixed
+# signs.  Otherwise all of its arborescences have the same sign, and sampling
+# adds nothing to the LU determinant.
+
+
+def mixed_signs(D):
+    signs = np.concatenate((D.sign, D.root_sign[D.root_vertices()]))
+    return bool((signs < 0).any() and (signs > 0).any())
+
+
+# Routine to estimate the arborescence weight sum from batches of samples.
+# After each batch, yields the number of samples so far, the estimate, and the
+# half width of its confidence interval, with the estimate and the half width
+# given as (sign, log of the absolute value) pairs.
+
+
+def iter_estimates(D, samples, batch=1000, seed=None, confidence=0.95):
+
+    sampler = ArborescenceSampler(D, seed)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    log_z = sampler.log_normalizer
+
+    if not sampler.spanning or log_z == -np.inf:
+        yield 0, (0.0, -np.inf), (0.0, -np.inf)
+        return
+
+    count = 0
+    total = 0.0
+    total_sq = 0.0
+
+    while count < samples:
+        size = min(batch, samples - count)
+        signs = sampler.sample(size)[1]
+        count += size
+        total += np.sum(signs)
+        total_sq += np.sum(signs * signs)
+
+        mean = total / count
+        var = max(total_sq / count - mean * mean, 0) / max(count - 1, 1)
+        half = z * np.sqrt(var)
+
+        with np.errstate(divide="ignore"):
+            yield (
+                count,
+                (np.sign(mean), log_z + np.log(np.abs(mean))),
+                (np.sign(half), log_z + np.log(half)),
+            )
@@ -0,0 +1,156 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code splits a matrix digraph into the strongly connected components of
+# its non-root part.  With the vertices ordered by component, the matrix is
+# block triangular, so its determinant is the product of the determinants of
+# the diagonal blocks.  The diagonal block of a component S is itself the
+# matrix of a matrix digraph on S: its arcs are the arcs within S, and its root
+# arc into v is the root arc of the full digraph merged with the arcs into v
+# from outside S (the column sum of the block).  The blocks are relabeled
+# 1..k but keep the vertex ids, and thus the arc labels, of the full digraph,
+# with a merged root arc labeled by the sum of the labels of its arcs.
+
+import numpy as np
+import matrix_graph as mg
+
+# Routine to return the component number of each vertex 1..n, by scipy if it
+# is available and by networkx otherwise
+
+
+def _components(D):
+
+    try:
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import connected_components
+    except ImportError:
+        connected_components = None
+
+    if connected_components is not None:
+        a = csr_matrix(
+            (np.ones(len(D.tail)), (D.tail - 1, D.head - 1)),
+            shape=(D.n, D.n),
+        )
+        return connected_components(a, directed=True, connection="strong")[1]
+
+    import networkx as nx
+
+    g = nx.DiGraph()
+    g.add_nodes_from(range(D.n))
+    g.add_edges_from(zip(D.tail - 1, D.head - 1))
+    comp = np.zeros(D.n, int)
+    for c, nodes in enumerate(nx.strongly_connected_components(g)):
+        comp[list(nodes)] = c
+    return comp
+
+
+# Routine to return the diagonal blocks of a matrix digraph, in the array or
+# networkx form, as a list of matrix digraphs, ordered by their smallest
+# vertex.  If labels is True, the merged root arcs get summed labels.
+
+
+def blocks(g, labels=False):
+
+    D = (
+        g
+        if isinstance(g, mg.MatrixDigraph)
+        else mg.MatrixDigraph.from_graph(g)
+    )
+
+    if D.n < 1:
+        return []
+
+    comp = np.zeros(D.n + 1, int)
+    comp[1:] = _components(D)
+
+    # Renumber the components by their smallest vertex
+
+    first = np.full(comp.max() + 1, D.n + 1)
+    np.minimum.at(first, comp[1:], np.arange(1, D.n + 1))
+    rank = np.empty_like(first)
+    rank[np.argsort(first)] = np.arange(len(first))
+    comp[1:] = rank[comp[1:]]
+
+    inside = comp[D.tail] == comp[D.head]
+    outside = ~inside
+
+    root = D.root + np.bincount(
+        D.head[outside], weights=D.weight[outside], minlength=D.n + 1
+    )
+
+    # Local vertex numbers within each component
+
+    vertices = np.argsort(comp[1:], kind="stable") + 1
+    ptr = np.searchsorted(comp[vertices], np.arange(len(first) + 1))
+    local = np.zeros(D.n + 1, int)
+    local[vertices] = np.arange(D.n) - ptr[comp[vertices]] + 1
+
+    root_labels = {}
+    if labels:
+        for u, v in zip(D.tail[outside], D.head[outside]):
+            if v not in root_labels:
+                root_labels[v] = [D.label(0, v)] if D.root[v] else []
+            root_labels[v].append(D.label(u, v))
+
+    # The arcs within each component, grouped by component
+
+    arcs = np.flatnonzero(inside)
+    arcs = arcs[np.argsort(comp[D.tail[arcs]], kind="stable")]
+    arc_ptr = np.searchsorted(comp[D.tail[arcs]], np.arange(len(first) + 1))
+
+    result = []
+
+    for c in range(len(first)):
+        S = vertices[ptr[c] : ptr[c + 1]]
+        k = arcs[arc_ptr[c] : arc_ptr[c + 1]]
+        result.append(
+            mg.MatrixDigraph(
+                len(S),
+                local[D.tail[k]],
+                local[D.head[k]],
+                D.weight[k],
+                np.concatenate(([0], root[S])),
+                ids=np.concatenate(([0], D.ids[S])),
+                root_labels={
+                    int(local[v]): "+".join(root_labels[v])
+                    for v in S
+                    if v in root_labels
+                },
+            )
+        )
+
+    return result
+
+
+# Routine to compute the (sign, log of the absolute value) of the determinant
+# as the product over the blocks of their LU determinants
+
+
+def compute_LU_slogdet_by_blocks(g):
+
+    sign, log = 1.0, 0.0
+    for B in blocks(g):
+        s, l = mg.compute_LU_slogdet_from_graph(B)
+        sign *= s
+        log += l
+
+    return sign, log
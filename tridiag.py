@@ -0,0 +1,260 @@
+# //////////////////////////////////////////////////////////////////////////////
+#  Copyright (c) 2025 Clemson University.
+#
+#  This file was originally written by Sayani Ghosh and Bradley S. Meyer.
+#
+#  This is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This software is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this software; if not, write to the Free Software
+#  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307
+#  USA
+#
+# //////////////////////////////////////////////////////////////////////////////
+
+# This code runs the tridiagonal determinant recursion on a batch of
+# tridiagonal matrix digraphs at once.  A batch of B digraphs on n vertices is
+# given by the root arc weights root[b, i - 1] (arc 0 -> i), the weights
+# up[b, i - 1] of the arcs i -> i + 1, and the weights down[b, i - 1] of the
+# arcs i + 1 -> i.  The recursion is
+#
+#   d_i = (w(i-1, i) + w(0, i)) d_{i-1} + w(0, i) w(i, i-1) d~_{i-1}
+#   d~_i = d_{i-1} + w(i, i-1) d~_{i-1}
+#
+# with d_1 = w(0, 1) and d~_1 = 1.  The leading principal minor of order i
+# of the matrix is d~_{i+1} for i < n and d_n for i = n.
+
+import numpy as np
+
+# Routine to return the (root, up, down) arrays of a tridiagonal matrix
+# digraph in its array form, each with a leading batch axis of length one
+
+
+def arrays_from_digraph(D):
+
+    if np.any(np.abs(D.tail - D.head) > 1):
+        k = np.flatnonzero(np.abs(D.tail - D.head) > 1)[0]
+        raise ValueError(
+            f"Arc ({D.tail[k]}, {D.head[k]}) should not be in tridiagonal "
+            "graph."
+        )
+
+    up = np.zeros(max(D.n - 1, 0))
+    down = np.zeros(max(D.n - 1, 0))
+    k = D.head == D.tail + 1
+    up[D.tail[k] - 1] = D.weight[k]
+    k = D.head == D.tail - 1
+    down[D.head[k] - 1] = D.weight[k]
+
+    return D.root[None, 1:], up[None, :], down[None, :]
+
+
+# Routine to return the (root, up, down) arrays of a stack of tridiagonal
+# matrices a of shape (B, n, n).  Only the three diagonals are read.
+
+
+def arrays_from_matrices(a):
+
+    a = np.asarray(a, dtype=float)
+    if a.ndim == 2:
+        a = a[None]
+
+    diag = np.diagonal(a, axis1=1, axis2=2)
+    upper = np.diagonal(a, offset=1, axis1=1, axis2=2)
+    lower = np.diagonal(a, offset=-1, axis1=1, axis2=2)
+
+    root = diag.copy()
+    root[:, 1:] += upper
+    root[:, :-1] += lower
+
+    return root, -upper, -lower
+
+
+# Routine to compute the leading principal minors of a batch of tridiagonal
+# matrices.  Returns an array of shape (B, n) of the minors or, if log is
+# True, a (sign, log of the absolute value) pair of such arrays.  In the log
+# form, the pair (d, d~) is rescaled at each step so that long chains neither
+# overflow nor underflow.
+
+
+def leading_minors(root, up, down, log=False):
+
+    root = np.atleast_2d(np.asarray(root, dtype=float))
+    up = np.atleast_2d(np.asarray(up, dtype=float))
+    down = np.atleast_2d(np.asarray(down, dtype=float))
+
+    B, n = root.shape
+
+    minors = np.zeros((B, n))
+    scale = np.zeros((B, n))
+
+    d = root[:, 0].copy()
+    d_tilde = np.ones(B)
+    s = np.zeros(B)
+
+    for i in range(1, n):
+        r = root[:, i]
+        w_up = up[:, i - 1]
+        w_down = down[:, i - 1]
+        dp = (w_up + r) * d + r * w_down * d_tilde
+        d_tilde = d + w_down * d_tilde
+        d = dp
+        minors[:, i - 1] = d_tilde
+        scale[:, i - 1] = s
+        if log:
+            m = np.maximum(np.abs(d), np.abs(d_tilde))
+            m[m == 0] = 1
+            d /= m
+            d_tilde /= m
+            s += np.log(m)
+
+    minors[:, n - 1] = d
+    scale[:, n - 1] = s
+
+    if not log:
+        return minors
+
+    with np.errstate(divide="ignore"):
+        return np.sign(minors), scale + np.log(np.abs(minors))
+
+
+# Routine to compute the determinants of a batch of tridiagonal matrices
+
+
+def determinants(root, up, down, log=False):
+
+    if log:
+        sign, logdet = leading_minors(root, up, down, log=True)
+        return sign[:, -1], logdet[:, -1]
+
+    return leading_minors(root, up, down)[:, -1]
+
+
+# Routine to return the bandwidth of a matrix digraph in its array form, the
+# largest |u - v| over the arcs u -> v among vertices 1..n
+
+
+def bandwidth(D):
+    return int(np.max(np.abs(D.tail - D.head), initial=0))
+
+
+# Routine to return the blocks of a matrix digraph in its array form,
+# partitioned into blocks of size b (by default, the bandwidth).  The matrix
+# is block tridiagonal if b is at least the bandwidth.  The last block is
+# padded with the identity if b does not divide n.  Returns the diagonal
+# blocks (1, m, b, b), the upper blocks (1, m - 1, b, b), with upper[k] the
+# block in block row k and block column k + 1, and the lower blocks
+# (1, m - 1, b, b), with lower[k] the block in block row k + 1 and block
+# column k.
+
+
+def block_arrays_from_digraph(D, b=None):
+
+    if b is None:
+        b = max(bandwidth(D), 1)
+
+    if bandwidth(D) > b:
+        raise ValueError(
+            f"Bandwidth {bandwidth(D)} is larger than the block size {b}."
+        )
+
+    m = -(-D.n // b)
+
+    diag = np.zeros((m * b, b))
+    upper = np.zeros((max(m - 1, 0) * b, b))
+    lower = np.zeros((max(m - 1, 0) * b, b))
+
+    i, j = D.tail - 1, D.head - 1
+    I, J = i // b, j // b
+
+    k = I == J
+    diag[i[k], j[k] % b] = -D.weight[k]
+    k = J == I + 1
+    upper[i[k], j[k] % b] = -D.weight[k]
+    k = J == I - 1
+    lower[i[k] - b, j[k] % b] = -D.weight[k]
+
+    v = np.arange(m * b)
+    a_vv = (
+        D.root[1:]
+        + np.bincount(D.head, weights=D.weight, minlength=D.n + 1)[1:]
+    )
+    diag[v, v % b] = np.concatenate((a_vv, np.ones(m * b - D.n)))
+
+    return (
+        diag.reshape(1, m, b, b),
+        upper.reshape(1, -1, b, b),
+        lower.reshape(1, -1, b, b),
+    )
+
+
+# Routine to compute the determinants of a batch of block-tridiagonal
+# matrices by the block Schur recursion
+#
+#   S_1 = A_11,  S_k = A_kk - A_k,k-1 S_{k-1}^-1 A_k-1,k
+#
+# with the determinant the product of the det(S_k).  This takes O(n b^2)
+# operations for n rows and block size b.  Should an S_k be singular for a
+# matrix, that matrix is done by dense LU decomposition instead.  Returns the
+# determinants or, if log is True, a (sign, log of the absolute value) pair.
+
+
+def block_determinants(diag, upper, lower, log=False):
+
+    B, m, b, _ = diag.shape
+
+    sign = np.ones(B)
+    logdet = np.zeros(B)
+    failed = np.zeros(B, bool)
+    eye = np.eye(b)
+
+    S = diag[:, 0]
+
+    for k in range(m):
+        if k > 0:
+            S = diag[:, k] - lower[:, k - 1] @ np.linalg.solve(
+                S, upper[:, k - 1]
+            )
+        s, l = np.linalg.slogdet(S)
+        sign *= s
+        logdet += l
+        singular = s == 0
+        if singular.any():
+            failed |= singular
+            S = S.copy()
+            S[singular] = eye
+
+    for i in np.flatnonzero(failed):
+        a = np.zeros((m * b, m * b))
+        for k in range(m):
+            a[k * b : (k + 1) * b, k * b : (k + 1) * b] = diag[i, k]
+            if k > 0:
+                a[(k - 1) * b : k * b, k * b : (k + 1) * b] = upper[i, k - 1]
+                a[k * b : (k + 1) * b, (k - 1) * b : k * b] = lower[i, k - 1]
+        sign[i], logdet[i] = np.linalg.slogdet(a)
+
+    if log:
+        return sign, logdet
+
+    return sign * np.exp(logdet)
+
+
+# Routine to compute the determinant of a banded matrix digraph in its array
+# form, by the tridiagonal recursion for bandwidth one and by the block
+# recursion otherwise
+
+
+def banded_determinant(D, b=None, log=False):
+
+    if (b is None or b == 1) and bandwidth(D) <= 1:
+        return determinants(*arrays_from_digraph(D), log=log)
+
+    return block_determinants(*block_arrays_from_digraph(D, b), log=log)